@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Local multi-node replica set benchmark for the mongodb role templates.
+
+For every configuration profile this starts N mongod processes on one
+box, each with a mongod.conf rendered from roles/mongodb/templates with
+group_vars/all plus the profile overrides.  The member list is rendered
+from init_replica_nodes/tasks/members.yml and the replica set is initiated
+with the mongodb_replicaset module of add_slaves_to_replica, then a
+YCSB-style load and run phase is driven against the primary.  Reports
+throughput, p50/p99 latency per operation and replication lag per profile.
+
+Usage:
+    python3 benchmarks/replica_set.py [--nodes 3] [--records 10000] [--operations 50000]
+                                      [--mix read=50,update=45,insert=5] [--threads 8]
+                                      [--distribution zipfian] [--write-concern majority]
+                                      [--profiles baseline,zstd] [--profiles-file profiles.yml]
+                                      [--no-tls] [--json results.json]
+
+Profiles are group_vars overrides, e.g. in --profiles-file:
+
+    write_heavy:
+      mongodb_workload: write_heavy
+      mongodb_journal_compressor: zstd
+
+A profile may also set host_vars per node (node0, node1, ...) with the
+member attributes create_ansible_replica_hosts writes, e.g.:
+
+    delayed_member:
+      host_vars:
+        node2:
+          mongodb_member_hidden: true
+          mongodb_member_secondary_delay_secs: 60
+
+Requires mongod on the PATH, plus jinja2, pyyaml, pymongo,
+ansible-core (for the tuning filter and mongodb_replicaset) and cryptography (unless --no-tls).
+Runs entirely on localhost - no cloud access.
+
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import ast
+import json
+import time
+import base64
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import importlib.util
+
+import yaml
+import jinja2
+
+from pymongo import MongoClient
+from pymongo.write_concern import WriteConcern
+
+ANSIBLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "execgroups", "_config0_configs",
+                           "ubuntu_vendor_setup", "_chrootfiles", "var", "tmp", "ansible")
+ROLES_DIR = os.path.join(ANSIBLE_DIR, "roles")
+
+# Built-in profiles - group_vars overrides
+PROFILES = {
+    "baseline": {},
+    "zstd": {
+        "mongodb_block_compressor": "zstd",
+        "mongodb_journal_compressor": "zstd",
+        "mongodb_network_compression": "zstd,snappy"
+    },
+    "read_heavy": {"mongodb_workload": "read_heavy"},
+    "write_heavy": {"mongodb_workload": "write_heavy"}
+}
+
+OPERATIONS = ["read", "update", "insert"]
+
+ADMIN_USER = "bench"
+ADMIN_PASS = "bench"
+
+
+def _load_role_module(*path):
+    """Import a python file shipped with a role (filter plugin or library module)."""
+    spec = importlib.util.spec_from_file_location(os.path.splitext(path[-1])[0], os.path.join(ROLES_DIR, *path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _load_tuning_filter():
+    """Import mongodb_tuning_profile from the role's filter plugin."""
+    return _load_role_module("mongodb", "filter_plugins", "mongodb_tuning.py").mongodb_tuning_profile
+
+
+def _memtotal_mb():
+    with open("/proc/meminfo") as meminfo:
+        for line in meminfo:
+            if line.startswith("MemTotal:"):
+                return int(line.split()[1]) / 1024
+    raise Exception("MemTotal not found in /proc/meminfo")
+
+
+def _template_env(*template_dirs):
+    # the Ansible filters used by the templates
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(list(template_dirs)),
+                             undefined=jinja2.StrictUndefined)
+    env.filters["bool"] = lambda value: str(value).lower() in ["true", "1", "yes", "on"]
+    env.filters["to_json"] = json.dumps
+    env.filters["unique"] = lambda values: list(dict.fromkeys(values))
+    return env
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100.0), len(values) - 1)]
+
+
+class LocalReplicaSet(object):
+    """N local mongods rendered from mongod.conf.j2 for one profile."""
+
+    def __init__(self, workdir, profile, nodes, base_port, tls):
+        self.workdir = workdir
+        self.nodes = nodes
+        self.ports = [base_port + index for index in range(nodes)]
+        self.tls = tls
+        self.processes = []
+
+        # per node member attributes, as written to host_vars/<ip>.yml
+        profile = dict(profile)
+        self.host_vars = profile.pop("host_vars", None) or {}
+
+        # role defaults (replica set settings), then group_vars, then the profile
+        self.vars = {}
+        for path in [os.path.join(ROLES_DIR, "init_replica_nodes", "defaults", "main.yml"),
+                     os.path.join(ANSIBLE_DIR, "group_vars", "all")]:
+            with open(path) as vars_file:
+                self.vars.update(yaml.safe_load(vars_file))
+
+        self.vars.update(profile)
+        self.vars.update({
+            "mongodb_repl_set_name": "rs0",
+            "mongodb_bind_ip": "127.0.0.1",
+            "mongodb_admin_user": ADMIN_USER,
+            "mongodb_admin_pass": ADMIN_PASS,
+            "mongodb_keyfile": "defined",
+            "mongodb_keyfile_path": os.path.join(workdir, "keyfile")
+        })
+
+        if tls:
+            self.vars["mongodb_pem"] = "defined"
+            self.vars["mongodb_pem_path"] = os.path.join(workdir, "mongodb.pem")
+
+        # the nodes share the box - split its memory between them
+        self.vars["mongodb_tuning"] = _load_tuning_filter()(
+            self.vars.get("mongodb_instance_type", ""),
+            memtotal_mb=_memtotal_mb() / nodes,
+            volume_size_gb=self.vars.get("mongodb_volume_size_gb", "auto"),
+            workload=self.vars.get("mongodb_workload", "mixed"),
+            cache_size_gb=self.vars.get("mongodb_wt_cache_size_gb", "auto"),
+            oplog_size_mb=self.vars.get("mongodb_repl_oplog_size", "auto"),
+            max_incoming_connections=self.vars.get("mongodb_max_incoming_connections", "auto"),
+            journal_commit_interval_ms=self.vars.get("mongodb_journal_commit_interval_ms", "auto"))
+
+    def _write_secrets(self):
+        with open(self.vars["mongodb_keyfile_path"], "w") as keyfile:
+            keyfile.write(base64.b64encode(os.urandom(756)).decode())
+        os.chmod(self.vars["mongodb_keyfile_path"], 0o600)
+
+        if self.tls:
+            sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+            from tls_handshake import generate_pem
+
+            with open(self.vars["mongodb_pem_path"], "w") as pem_file:
+                pem_file.write(generate_pem("rsa2048"))
+            os.chmod(self.vars["mongodb_pem_path"], 0o600)
+
+    def _members(self):
+        """
+        Render the member list with init_replica_nodes/tasks/members.yml -
+        node0 stands in for the config_network host, the others for
+        private-secondaries. The nodes share 127.0.0.1, so each member host
+        is then mapped to its node's port.
+        """
+        with open(os.path.join(ROLES_DIR, "init_replica_nodes", "tasks", "members.yml")) as tasks_file:
+            expression = yaml.safe_load(tasks_file)[0]["set_fact"]["mongodb_replset_members"]
+
+        names = [f"node{index}" for index in range(self.nodes)]
+        rendered = _template_env().from_string(expression).render(
+            groups={"config_network": names[:1], "private-secondaries": names[1:]},
+            hostvars=dict((name, self.host_vars.get(name, {})) for name in names),
+            **self.vars)
+
+        members = ast.literal_eval(rendered.strip())
+        for member in members:
+            member["host"] = f"127.0.0.1:{self.ports[names.index(member['host'].split(':')[0])]}"
+
+        return members
+
+    def start(self):
+        self._write_secrets()
+        env = _template_env(os.path.join(ROLES_DIR, "mongodb", "templates"))
+
+        for index, port in enumerate(self.ports):
+            node_dir = os.path.join(self.workdir, f"node{index}")
+            os.makedirs(os.path.join(node_dir, "data"))
+
+            node_vars = dict(self.vars)
+            node_vars.update({
+                "mongodb_port": port,
+                "mongodb_dbpath": os.path.join(node_dir, "data"),
+                "mongodb_logpath": os.path.join(node_dir, "mongod.log")
+            })
+
+            config_path = os.path.join(node_dir, "mongod.conf")
+            with open(config_path, "w") as config_file:
+                config_file.write(env.get_template("mongod.conf.j2").render(**node_vars))
+
+            self.processes.append(subprocess.Popen(["mongod", "--config", config_path],
+                                                   stdout=subprocess.DEVNULL,
+                                                   stderr=subprocess.STDOUT))
+
+        for port in self.ports:
+            self._wait_port(port)
+
+    def _wait_port(self, port, timeout=60):
+        deadline = time.time() + timeout
+
+        while time.time() < deadline:
+            try:
+                self.client(port, auth=False).admin.command("ping")
+                return
+            except Exception:
+                time.sleep(0.2)
+
+        raise Exception(f"mongod on port {port} did not start - see its mongod.log")
+
+    def initiate(self):
+        """
+        Initiate the replica set and create the admin user with
+        mongodb_replicaset, as add_slaves_to_replica/tasks/initiate.yml does
+        for the 30-mongo-init-replica playbook.
+        """
+        replicaset = _load_role_module("add_slaves_to_replica", "library", "mongodb_replicaset.py")
+        members = self._members()
+
+        params = {
+            "login_host": "127.0.0.1",
+            "login_port": self.ports[0],
+            "login_user": ADMIN_USER,
+            "login_password": ADMIN_PASS,
+            "login_database": "admin",
+            "tls": self.tls,
+            "tls_allow_invalid_certificates": True,
+            "replica_set": self.vars["mongodb_repl_set_name"],
+            "members": members,
+            "settings": self.vars.get("mongodb_replset_settings"),
+            "timeout": int(self.vars.get("mongodb_init_timeout", 120))
+        }
+
+        replicaset.bootstrap_admin(params)
+
+        replica_set = replicaset.connect_primary(params)
+        try:
+            replica_set.wait_healthy(len(members))
+        finally:
+            replica_set.client.close()
+
+    def client(self, port=None, auth=True, **kwargs):
+        kwargs.update({
+            "host": "127.0.0.1",
+            "port": port or self.ports[0],
+            "directConnection": True,
+            "serverSelectionTimeoutMS": 5000
+        })
+
+        if self.tls:
+            kwargs["tls"] = True
+            kwargs["tlsAllowInvalidCertificates"] = True
+
+        if auth:
+            kwargs.update({"username": ADMIN_USER, "password": ADMIN_PASS, "authSource": "admin"})
+
+        return MongoClient(**kwargs)
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+
+        for process in self.processes:
+            try:
+                process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+class LagSampler(threading.Thread):
+    """Sample the largest secondary lag (seconds) while the run phase is active."""
+
+    def __init__(self, client, interval=0.5):
+        threading.Thread.__init__(self, daemon=True)
+        self.client = client
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            members = self.client.admin.command("replSetGetStatus")["members"]
+            primary = next((member for member in members if member["stateStr"] == "PRIMARY"), None)
+
+            if primary:
+                lags = [(primary["optimeDate"] - member["optimeDate"]).total_seconds()
+                        for member in members if member["stateStr"] == "SECONDARY"]
+                self.samples.append(max(lags) if lags else 0.0)
+
+            self.stopped.wait(self.interval)
+
+
+def _document(key, fields, field_size):
+    return {"_id": key, **{f"field{index}": os.urandom(field_size // 2).hex() for index in range(fields)}}
+
+
+def _key_chooser(distribution):
+    if distribution == "uniform":
+        return lambda rng, count: rng.randrange(count)
+
+    # YCSB style zipfian - a small hot set takes most of the requests
+    return lambda rng, count: min(int(rng.paretovariate(1.16)) - 1, count - 1)
+
+
+def run_workload(cluster, args):
+    """
+    Load args.records documents, then run args.operations operations of the
+    configured mix over args.threads threads.
+
+    Returns:
+        dict: throughput, latencies (ms) per operation, lag and catch-up time
+    """
+    client = cluster.client(maxPoolSize=args.threads * 2)
+    collection = client.ycsb.get_collection("usertable",
+                                            write_concern=WriteConcern(w=args.write_concern
+                                                                       if args.write_concern == "majority"
+                                                                       else int(args.write_concern)))
+    collection.drop()
+
+    # load phase
+    start = time.perf_counter()
+    for offset in range(0, args.records, 1000):
+        collection.insert_many([_document(key, args.fields, args.field_size)
+                                for key in range(offset, min(offset + 1000, args.records))])
+    load_seconds = time.perf_counter() - start
+
+    mix = dict((name, int(weight)) for name, weight in (item.split("=") for item in args.mix.split(",")))
+    operations = [name for name in OPERATIONS for _ in range(mix.get(name, 0))]
+    choose_key = _key_chooser(args.distribution)
+
+    latencies = dict((name, []) for name in OPERATIONS)
+    next_key = [args.records]
+    lock = threading.Lock()
+
+    def worker(seed, count):
+        rng = random.Random(seed)
+        local = dict((name, []) for name in OPERATIONS)
+
+        for _ in range(count):
+            operation = rng.choice(operations)
+            begin = time.perf_counter()
+
+            if operation == "read":
+                collection.find_one({"_id": choose_key(rng, args.records)})
+            elif operation == "update":
+                collection.update_one({"_id": choose_key(rng, args.records)},
+                                      {"$set": {"field0": os.urandom(args.field_size // 2).hex()}})
+            else:
+                with lock:
+                    key = next_key[0]
+                    next_key[0] += 1
+                collection.insert_one(_document(key, args.fields, args.field_size))
+
+            local[operation].append((time.perf_counter() - begin) * 1000)
+
+        with lock:
+            for name in OPERATIONS:
+                latencies[name].extend(local[name])
+
+    sampler = LagSampler(cluster.client())
+    sampler.start()
+
+    per_thread = args.operations // args.threads
+    threads = [threading.Thread(target=worker, args=(seed, per_thread)) for seed in range(args.threads)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    run_seconds = time.perf_counter() - start
+
+    sampler.stopped.set()
+    sampler.join()
+
+    # time for every secondary to apply the primary's last write
+    start = time.perf_counter()
+    last = client.admin.command("replSetGetStatus")["optimes"]["appliedOpTime"]
+    while True:
+        members = client.admin.command("replSetGetStatus")["members"]
+        if all(member["optime"]["ts"] >= last["ts"] for member in members if member["stateStr"] == "SECONDARY"):
+            break
+        time.sleep(0.01)
+    catch_up_ms = (time.perf_counter() - start) * 1000
+
+    every = [latency for name in OPERATIONS for latency in latencies[name]]
+
+    result = {
+        "load_docs_per_sec": args.records / load_seconds,
+        "ops_per_sec": len(every) / run_seconds,
+        "p50_ms": _percentile(every, 50),
+        "p99_ms": _percentile(every, 99),
+        "max_lag_seconds": max(sampler.samples) if sampler.samples else None,
+        "catch_up_ms": catch_up_ms,
+        "operations": {}
+    }
+
+    for name in OPERATIONS:
+        if latencies[name]:
+            result["operations"][name] = {
+                "count": len(latencies[name]),
+                "p50_ms": _percentile(latencies[name], 50),
+                "p99_ms": _percentile(latencies[name], 99)
+            }
+
+    return result
+
+
+def run_profile(name, profile, args):
+    """Benchmark one profile on a fresh local replica set."""
+    workdir = tempfile.mkdtemp(prefix=f"mongodb-bench-{name}-")
+    cluster = LocalReplicaSet(workdir, profile, args.nodes, args.base_port, not args.no_tls)
+
+    try:
+        cluster.start()
+        cluster.initiate()
+        result = run_workload(cluster, args)
+    finally:
+        cluster.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result["profile"] = name
+    result["tuning"] = cluster.vars["mongodb_tuning"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local replica set benchmark per configuration profile")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=27117)
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--operations", type=int, default=50000)
+    parser.add_argument("--fields", type=int, default=10)
+    parser.add_argument("--field-size", type=int, default=100)
+    parser.add_argument("--mix", default="read=50,update=45,insert=5")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--distribution", choices=["uniform", "zipfian"], default="zipfian")
+    parser.add_argument("--write-concern", default="majority")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--profiles-file")
+    parser.add_argument("--no-tls", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="keep the data and logs of each run")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    profiles = dict(PROFILES)
+    if args.profiles_file:
+        with open(args.profiles_file) as profiles_file:
+            profiles.update(yaml.safe_load(profiles_file) or {})
+
+    names = args.profiles.split(",")
+    unknown = [name for name in names if name not in profiles]
+    if unknown:
+        print(f"unknown profiles {unknown} - choose from {list(profiles)}")
+        sys.exit(4)
+
+    if not shutil.which("mongod"):
+        print("mongod not found on the PATH")
+        sys.exit(4)
+
+    results = [run_profile(name, profiles[name], args) for name in names]
+
+    print(f"{args.nodes} nodes, {args.records} records, {args.operations} operations ({args.mix}), "
+          f"{args.threads} threads, w={args.write_concern}\n")
+    print(f"{'profile':<14} {'load/s':>10} {'ops/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max lag s':>10} {'catch-up ms':>12}")
+    for result in results:
+        print(f"{result['profile']:<14} {result['load_docs_per_sec']:>10.1f} {result['ops_per_sec']:>10.1f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['max_lag_seconds'] if result['max_lag_seconds'] is not None else '-':>10} "
+              f"{result['catch_up_ms']:>12.1f}")
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(results, json_file, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+TLS handshake micro-benchmark for the create_keys certificate profiles.
+
+Generates a combined (self-signed) PEM per key profile, the same layout
+create_keys produces for mongodb.pem, and measures full TLS handshakes
+(no session resumption) between an in-memory client and server.  The
+server-side CPU time per handshake approximates the cost mongod pays on
+every new client or intra-replica connection.
+
+Usage:
+    python3 benchmarks/tls_handshake.py [--iterations 200] [--tls-version 1.3]
+                                        [--profiles rsa2048,ecdsa-p256]
+
+Requires the cryptography library.
+
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import ssl
+import sys
+import time
+import argparse
+import datetime
+import tempfile
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# Keep in sync with KEY_ALGORITHMS in scripts/_config0_configs/_bin/create_keys
+KEY_ALGORITHMS = {
+    "rsa2048": ("rsa", 2048),
+    "rsa3072": ("rsa", 3072),
+    "rsa4096": ("rsa", 4096),
+    "ecdsa-p256": ("ec", "P-256"),
+    "ecdsa-p384": ("ec", "P-384")
+}
+
+
+def generate_pem(key_algorithm):
+    """
+    Generate a combined certificate + key PEM for a key profile.
+
+    Args:
+        key_algorithm (str): Key profile from KEY_ALGORITHMS
+
+    Returns:
+        str: certificate PEM followed by key PEM
+    """
+    key_type, key_param = KEY_ALGORITHMS[key_algorithm]
+
+    if key_type == "ec":
+        key = ec.generate_private_key(ec.SECP256R1() if key_param == "P-256" else ec.SECP384R1())
+    else:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=key_param)
+
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    cert = (x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+
+    key_pem = key.private_bytes(encoding=serialization.Encoding.PEM,
+                                format=serialization.PrivateFormat.PKCS8,
+                                encryption_algorithm=serialization.NoEncryption())
+
+    return cert.public_bytes(serialization.Encoding.PEM).decode() + key_pem.decode()
+
+
+def _contexts(pem_path, tls_version):
+    """
+    Build server and client contexts mirroring mongod's requireTLS setup.
+
+    The client does not verify the certificate, like
+    --tlsAllowInvalidCertificates used by the playbooks.
+    """
+    version = ssl.TLSVersion.TLSv1_3 if tls_version == "1.3" else ssl.TLSVersion.TLSv1_2
+
+    server = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server.load_cert_chain(pem_path)
+    server.minimum_version = version
+    server.maximum_version = version
+    server.options |= ssl.OP_NO_TICKET
+
+    client = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    client.check_hostname = False
+    client.verify_mode = ssl.CERT_NONE
+    client.minimum_version = version
+    client.maximum_version = version
+
+    return server, client
+
+
+def _pump(src, dst):
+    """Move pending bytes from one memory BIO to another."""
+    data = src.read()
+    if data:
+        dst.write(data)
+
+
+def handshake(server_ctx, client_ctx):
+    """
+    Perform one full in-memory TLS handshake.
+
+    Returns:
+        float: CPU seconds spent in server-side handshake calls
+    """
+    c_in, c_out = ssl.MemoryBIO(), ssl.MemoryBIO()
+    s_in, s_out = ssl.MemoryBIO(), ssl.MemoryBIO()
+
+    client = client_ctx.wrap_bio(c_in, c_out, server_side=False)
+    server = server_ctx.wrap_bio(s_in, s_out, server_side=True)
+
+    server_cpu = 0.0
+    client_done = server_done = False
+
+    while not (client_done and server_done):
+        if not client_done:
+            try:
+                client.do_handshake()
+                client_done = True
+            except ssl.SSLWantReadError:
+                pass
+        _pump(c_out, s_in)
+
+        if not server_done:
+            start = time.process_time()
+            try:
+                server.do_handshake()
+                server_done = True
+            except ssl.SSLWantReadError:
+                pass
+            server_cpu += time.process_time() - start
+        _pump(s_out, c_in)
+
+    return server_cpu
+
+
+def run_profile(key_algorithm, iterations, tls_version):
+    """
+    Benchmark one key profile.
+
+    Returns:
+        dict: timing results for the profile
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pem_path = os.path.join(tmpdir, "mongodb.pem")
+        with open(pem_path, "w") as pem_file:
+            pem_file.write(generate_pem(key_algorithm))
+
+        server_ctx, client_ctx = _contexts(pem_path, tls_version)
+
+        # warm up
+        for _ in range(5):
+            handshake(server_ctx, client_ctx)
+
+        server_cpu = 0.0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            server_cpu += handshake(server_ctx, client_ctx)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "profile": key_algorithm,
+        "handshakes_per_sec": iterations / elapsed,
+        "wall_us": elapsed / iterations * 1e6,
+        "server_cpu_us": server_cpu / iterations * 1e6
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TLS handshake cost per certificate key profile")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--tls-version", choices=["1.2", "1.3"], default="1.3")
+    parser.add_argument("--profiles", default=",".join(KEY_ALGORITHMS))
+    args = parser.parse_args()
+
+    profiles = args.profiles.split(",")
+    unknown = [profile for profile in profiles if profile not in KEY_ALGORITHMS]
+    if unknown:
+        print(f"unknown profiles {unknown} - choose from {list(KEY_ALGORITHMS)}")
+        sys.exit(4)
+
+    results = [run_profile(profile, args.iterations, args.tls_version) for profile in profiles]
+    baseline = results[0]["server_cpu_us"]
+
+    print(f"TLS {args.tls_version}, {args.iterations} full handshakes per profile\n")
+    print(f"{'profile':<12} {'handshakes/s':>13} {'wall us':>10} {'server cpu us':>14} {'vs ' + profiles[0]:>12}")
+    for result in results:
+        print(f"{result['profile']:<12} {result['handshakes_per_sec']:>13.1f} "
+              f"{result['wall_us']:>10.1f} {result['server_cpu_us']:>14.1f} "
+              f"{result['server_cpu_us'] / baseline:>11.2f}x")
+
+
+if __name__ == '__main__':
+    main()
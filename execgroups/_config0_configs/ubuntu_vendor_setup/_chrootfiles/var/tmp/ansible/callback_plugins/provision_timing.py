@@ -0,0 +1,150 @@
+"""
+Ansible callback recording per task, per host timing as JSON.
+
+Every ansible-playbook run writes one document to
+$PROVISION_TIMING_DIR (default ./provision_timing) with the phase
+(entry point playbook), play, task, role, action, start/end and the
+duration, status and retry attempts on every host.  The provision_timing
+shellout aggregates the documents into a critical-path report.
+
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+DOCUMENTATION = r'''
+name: provision_timing
+type: aggregate
+short_description: Write per task, per host timing as JSON
+description:
+  - Writes one JSON document per playbook run for the provision_timing report.
+options:
+  timing_dir:
+    description: Directory the JSON documents are written to.
+    default: provision_timing
+    env:
+      - name: PROVISION_TIMING_DIR
+'''
+
+import os
+import json
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+
+class CallbackModule(CallbackBase):
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "aggregate"
+    CALLBACK_NAME = "provision_timing"
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self.playbook = None
+        self.phase = None
+        self.play = None
+        self.started = None
+        self.tasks = []
+        self.current = None
+        self.host_starts = {}
+
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super(CallbackModule, self).set_options(task_keys=task_keys, var_options=var_options, direct=direct)
+        self.timing_dir = self.get_option("timing_dir")
+
+    def v2_playbook_on_start(self, playbook):
+        self.playbook = os.path.basename(playbook._file_name)
+        self.started = time.time()
+
+    def v2_playbook_on_play_start(self, play):
+        # import_playbook (05-single-pass) - the imported entry point is the phase
+        included = getattr(play, "_included_path", None)
+        self.phase = os.path.basename(included) if included else self.playbook
+        self.play = play.get_name()
+
+    def _task_start(self, task, handler=False):
+        # linear strategy - a task finishes on every host before the next
+        # one starts, so each entry is one step on the critical path
+        self.current = {
+            "seq": len(self.tasks),
+            "phase": self.phase,
+            "play": self.play,
+            "task": task.get_name(),
+            "role": task._role.get_name() if task._role else None,
+            "action": task.action,
+            "handler": handler,
+            "start": time.time(),
+            "end": None,
+            "hosts": {}
+        }
+        self.tasks.append(self.current)
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._task_start(task)
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._task_start(task, handler=True)
+
+    def v2_runner_on_start(self, host, task):
+        self.host_starts[(host.get_name(), task._uuid)] = time.time()
+
+    def _record(self, result, status):
+        if not self.current:
+            return
+
+        now = time.time()
+        host = result._host.get_name()
+        start = self.host_starts.pop((host, result._task._uuid), self.current["start"])
+
+        self.current["hosts"][host] = {
+            "duration": round(now - start, 3),
+            "status": status,
+            "attempts": result._result.get("attempts", 1)
+        }
+        self.current["end"] = now
+
+    def v2_runner_on_ok(self, result):
+        self._record(result, "changed" if result._result.get("changed") else "ok")
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._record(result, "ignored" if ignore_errors else "failed")
+
+    def v2_runner_on_skipped(self, result):
+        self._record(result, "skipped")
+
+    def v2_runner_on_unreachable(self, result):
+        self._record(result, "unreachable")
+
+    def v2_playbook_on_stats(self, stats):
+        ended = time.time()
+
+        for task in self.tasks:
+            task["end"] = task["end"] or task["start"]
+            task["duration"] = round(task["end"] - task["start"], 3)
+
+        document = {
+            "playbook": self.playbook,
+            "start": self.started,
+            "end": ended,
+            "duration": round(ended - self.started, 3),
+            "tasks": self.tasks
+        }
+
+        os.makedirs(self.timing_dir, exist_ok=True)
+        path = os.path.join(self.timing_dir, f"{int(self.started * 1000)}-{self.playbook}.json")
+
+        with open(path, "w") as timing_file:
+            json.dump(document, timing_file)
@@ -0,0 +1,590 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+DOCUMENTATION = r'''
+---
+module: mongodb_replicaset
+short_description: Bootstrap a MongoDB replica set over one authenticated connection
+description:
+  - Initiates the replica set when needed, adds missing members (one batched
+    reconfig, then one vote change per reconfig), applies changed member
+    attributes to existing members, waits for member state
+    transitions with a short backoff, verifies replication with a majority
+    of data-bearing members and returns the replica set status as JSON.
+  - Uses a single pymongo connection, so TLS and SCRAM are paid once.
+requirements:
+  - pymongo >= 3.11
+options:
+  login_host:
+    description: Host of the mongod to connect to.
+    default: localhost
+  login_port:
+    description: Port of the mongod to connect to.
+    default: 27017
+  login_user:
+    description: Admin user. Omit to use the localhost exception.
+  login_password:
+    description: Admin password.
+  login_database:
+    description: Authentication database.
+    default: admin
+  tls:
+    description: Connect with TLS.
+    default: true
+  tls_allow_invalid_certificates:
+    description: Skip certificate validation (self-signed mongodb.pem).
+    default: true
+  replica_set:
+    description: Replica set name, used when the set has to be initiated.
+    default: rs0
+  members:
+    description: Desired members (host, priority, votes, tags, hidden, arbiterOnly, secondaryDelaySecs).
+    type: list
+  settings:
+    description: Replica set settings used when the set has to be initiated.
+    type: dict
+  wait_healthy:
+    description: Wait until every member is PRIMARY, SECONDARY or ARBITER.
+    default: true
+  verify_replication:
+    description: Write a test document acknowledged by all non-delayed data-bearing members.
+    default: true
+  timeout:
+    description: Seconds to wait for each state transition.
+    default: 120
+  max_lag_seconds:
+    description: Secondaries with more replication lag are reported unhealthy.
+    default: 10
+  seed_timestamp:
+    description:
+      - Epoch seconds of the snapshot the new members were seeded from.
+      - When set, the oplog on this node must still reach back to it before
+        any member is added, so the new members only replay the oplog.
+  seed_min_headroom:
+    description: Seconds the oplog window must extend past the seed timestamp.
+    default: 3600
+  create_admin:
+    description:
+      - Initiate a fresh node and create login_user as root through the
+        localhost exception before connecting with it.
+    default: false
+'''
+
+EXAMPLES = r'''
+- name: Initiate the replica set and create the admin user
+  mongodb_replicaset:
+    login_user: "{{ mongodb_admin_user }}"
+    login_password: "{{ mongodb_admin_pass }}"
+    members: "{{ mongodb_replset_members }}"
+    settings: "{{ mongodb_replset_settings }}"
+    create_admin: true
+    wait_healthy: false
+    verify_replication: false
+
+- name: Bootstrap the replica set
+  mongodb_replicaset:
+    login_user: "{{ mongodb_admin_user }}"
+    login_password: "{{ mongodb_admin_pass }}"
+    login_port: "{{ mongodb_port }}"
+    members: "{{ mongodb_replset_members }}"
+  register: replset
+'''
+
+RETURN = r'''
+config_version:
+  description: Replica set config version after the run.
+members:
+  description: name, state, health, uptime, hidden, lag_seconds and delay_seconds per member.
+added:
+  description: Hosts added to the replica set by this run.
+admin_created:
+  description: Whether create_admin created login_user.
+updated:
+  description: Existing members whose priority, hidden, tags, secondaryDelaySecs or votes were changed.
+replication_verified:
+  description: Whether the test write was acknowledged by every non-delayed data-bearing member.
+oplog:
+  description: Oplog size (MB) and window (hours) on the connected node.
+seed:
+  description: Seed timestamp, oldest oplog entry and headroom (seconds) when seed_timestamp is set.
+elapsed_seconds:
+  description: Wall-clock seconds spent in the module.
+'''
+
+import time
+import traceback
+
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
+
+try:
+    from pymongo import MongoClient
+    from pymongo.errors import OperationFailure, PyMongoError
+    from pymongo.write_concern import WriteConcern
+    HAS_PYMONGO = True
+    PYMONGO_IMPORT_ERROR = None
+except ImportError:
+    HAS_PYMONGO = False
+    PYMONGO_IMPORT_ERROR = traceback.format_exc()
+
+HEALTHY_STATES = ["PRIMARY", "SECONDARY", "ARBITER"]
+
+# error codes worth retrying while a previous reconfig/election settles
+RETRY_CODES = [
+    10107,  # NotWritablePrimary
+    109,    # ConfigurationInProgress
+    308,    # CurrentConfigNotCommittedYet
+    13436   # NotPrimaryOrSecondary
+]
+
+NOT_YET_INITIALIZED = 94
+UNAUTHORIZED = 13
+USER_ALREADY_EXISTS = 51003
+
+# member attributes reconciled on existing members - votes are changed one
+# member per reconfig, arbiterOnly cannot change without re-adding the member
+MEMBER_ATTRIBUTES = {"priority": 1, "hidden": False, "tags": {}, "secondaryDelaySecs": 0}
+
+
+class Backoff(object):
+    """Short exponential backoff bounded by a deadline."""
+
+    def __init__(self, timeout, initial=0.1, maximum=2.0):
+        self.deadline = time.time() + timeout
+        self.delay = initial
+        self.maximum = maximum
+
+    def expired(self):
+        return time.time() >= self.deadline
+
+    def sleep(self):
+        time.sleep(min(self.delay, max(self.deadline - time.time(), 0)))
+        self.delay = min(self.delay * 2, self.maximum)
+
+
+class ReplicaSet(object):
+
+    def __init__(self, client, timeout):
+        self.client = client
+        self.admin = client.admin
+        self.timeout = timeout
+
+    def wait_until(self, condition, description):
+        """Poll condition() with backoff until it returns a truthy value."""
+        backoff = Backoff(self.timeout)
+        last_error = None
+
+        while True:
+            try:
+                result = condition()
+                if result:
+                    return result
+            except PyMongoError as error:
+                last_error = error
+
+            if backoff.expired():
+                raise Exception(f"timed out after {self.timeout}s waiting for {description}"
+                                f"{': ' + str(last_error) if last_error else ''}")
+            backoff.sleep()
+
+    def get_config(self):
+        try:
+            return self.admin.command("replSetGetConfig")["config"]
+        except OperationFailure as error:
+            if error.code == NOT_YET_INITIALIZED:
+                return None
+            raise
+
+    def get_status(self):
+        return self.admin.command("replSetGetStatus")
+
+    def is_primary(self):
+        return self.admin.command("hello").get("isWritablePrimary")
+
+    def initiate(self, name, members, settings):
+        config = {"_id": name, "members": members}
+        if settings:
+            config["settings"] = settings
+
+        self.admin.command("replSetInitiate", config)
+        self.wait_until(self.is_primary, "this node to become primary")
+
+    def reconfig(self, mutate):
+        """Apply mutate(config) and reconfig, retrying while a previous change settles."""
+        backoff = Backoff(self.timeout)
+
+        while True:
+            config = self.get_config()
+            config["version"] += 1
+            mutate(config)
+
+            try:
+                return self.admin.command("replSetReconfig", config)
+            except OperationFailure as error:
+                if error.code not in RETRY_CODES or backoff.expired():
+                    raise
+            backoff.sleep()
+
+    def missing_members(self, desired):
+        existing = set(member["host"] for member in self.get_config()["members"])
+        return [member for member in desired if member["host"] not in existing]
+
+    def oplog_first_time(self):
+        first = self.client.local["oplog.rs"].find_one(sort=[("$natural", 1)], projection={"ts": 1})
+        return first["ts"].time if first else None
+
+    def check_seed(self, seed_timestamp, min_headroom, max_lag_seconds):
+        """
+        Members seeded from a snapshot resume replication from the snapshot
+        time. The oldest oplog entry must be older than that (less the
+        source's allowed lag), with enough headroom that the oplog does not
+        roll past it while the members catch up - otherwise they go stale
+        and fall back to a full initial sync.
+        """
+        oldest = self.oplog_first_time()
+        headroom = seed_timestamp - max_lag_seconds - oldest if oldest else None
+
+        seed = {
+            "seed_timestamp": seed_timestamp,
+            "oplog_first_timestamp": oldest,
+            "headroom_seconds": headroom
+        }
+
+        if headroom is None or headroom < min_headroom:
+            raise Exception(f"oplog window does not cover the seed snapshot: {seed} - minimum headroom is "
+                            f"{min_headroom}s; take a new snapshot or grow the oplog")
+
+        return seed
+
+    def add_members(self, desired):
+        """
+        Add missing members in one reconfig as non-voting members, then grant
+        votes one member per reconfig (MongoDB rejects more than one voting
+        member change per reconfig).
+        """
+        missing = self.missing_members(desired)
+
+        if not missing:
+            return []
+
+        def _add(config):
+            next_id = max(member["_id"] for member in config["members"]) + 1
+            for member in missing:
+                new_member = dict(member)
+                new_member["_id"] = next_id
+                if not new_member.get("arbiterOnly"):
+                    new_member["votes"] = 0
+                    new_member["priority"] = 0
+                config["members"].append(new_member)
+                next_id += 1
+
+        self.reconfig(_add)
+
+        for member in missing:
+            if member.get("arbiterOnly") or not member.get("votes", 1):
+                continue
+
+            def _grant(config, member=member):
+                for current in config["members"]:
+                    if current["host"] == member["host"]:
+                        current["votes"] = member.get("votes", 1)
+                        current["priority"] = member.get("priority", 1)
+
+            self.reconfig(_grant)
+
+        return [member["host"] for member in missing]
+
+    def update_members(self, desired):
+        """
+        Apply changed priority, hidden, tags, secondaryDelaySecs and votes
+        to existing members: the attributes in one reconfig, then votes one
+        member per reconfig.
+        """
+        wanted = dict((member["host"], member) for member in desired)
+        current = dict((member["host"], member) for member in self.get_config()["members"])
+
+        changed = {}
+        votes = []
+
+        for host, member in wanted.items():
+            if host not in current:
+                continue
+
+            if bool(member.get("arbiterOnly")) != bool(current[host].get("arbiterOnly")):
+                raise Exception(f"{host} cannot change arbiterOnly in place - remove and re-add the member")
+
+            if "votes" in member and member["votes"] != current[host].get("votes", 1):
+                votes.append(host)
+
+            # a non-voting member must have priority 0 - a member gaining its
+            # vote gets its priority with the vote, one losing it drops the
+            # priority (and may turn hidden) first
+            gains_vote = host in votes and member["votes"] > current[host].get("votes", 1)
+
+            attributes = dict((key, member[key]) for key, default in MEMBER_ATTRIBUTES.items()
+                              if key in member and member[key] != current[host].get(key, default)
+                              and not (key == "priority" and gains_vote))
+            if attributes:
+                changed[host] = attributes
+
+        if changed:
+            def _update(config):
+                for member in config["members"]:
+                    member.update(changed.get(member["host"], {}))
+
+            self.reconfig(_update)
+
+        for host in votes:
+            def _vote(config, host=host):
+                for member in config["members"]:
+                    if member["host"] == host:
+                        member["votes"] = wanted[host]["votes"]
+                        member["priority"] = wanted[host].get("priority", member["priority"])
+
+            self.reconfig(_vote)
+
+        return sorted(set(changed) | set(votes))
+
+    def wait_healthy(self, expected_members):
+
+        def _healthy():
+            members = self.get_status()["members"]
+            if len(members) < expected_members:
+                return False
+            return all(member["stateStr"] in HEALTHY_STATES for member in members)
+
+        self.wait_until(_healthy, f"{expected_members} healthy members")
+
+    def verify_replication(self):
+        """
+        Write a test document that must be acknowledged by every non-delayed
+        data-bearing member - no sleeps and no per-secondary connections.
+        """
+        config = self.get_config()
+        data_bearing = [member for member in config["members"]
+                        if not member.get("arbiterOnly")
+                        and not member.get("secondaryDelaySecs", member.get("slaveDelay", 0))]
+
+        collection = self.admin.get_collection(
+            "repl_test",
+            write_concern=WriteConcern(w=len(data_bearing), wtimeout=self.timeout * 1000))
+
+        collection.insert_one({"test": "data", "timestamp": time.time()})
+        collection.drop()
+
+        return True
+
+    def summary(self, max_lag_seconds):
+        status = self.get_status()
+        primary = next((member for member in status["members"] if member["stateStr"] == "PRIMARY"), None)
+
+        # delayed members lag by design - only lag beyond the delay counts
+        configs = dict((member["host"], member) for member in self.get_config()["members"])
+
+        members = []
+        for member in status["members"]:
+            conf = configs.get(member["name"], {})
+            info = {
+                "name": member["name"],
+                "state": member["stateStr"],
+                "health": bool(member.get("health")),
+                "uptime": member.get("uptime"),
+                "hidden": bool(conf.get("hidden"))
+            }
+
+            if primary and member["stateStr"] == "SECONDARY":
+                lag = (primary["optimeDate"] - member["optimeDate"]).total_seconds()
+                info["lag_seconds"] = lag
+                info["delay_seconds"] = conf.get("secondaryDelaySecs", conf.get("slaveDelay", 0))
+                info["healthy"] = lag - info["delay_seconds"] < max_lag_seconds
+            else:
+                info["healthy"] = member["stateStr"] in HEALTHY_STATES
+
+            members.append(info)
+
+        first = self.oplog_first_time()
+        last = self.client.local["oplog.rs"].find_one(sort=[("$natural", -1)], projection={"ts": 1})
+        stats = self.client.local.command("collStats", "oplog.rs")
+
+        return {
+            "config_version": self.get_config()["version"],
+            "members": members,
+            "oplog": {
+                "size_mb": stats.get("maxSize", 0) / (1024 * 1024),
+                "window_hours": (last["ts"].time - first) / 3600.0 if first and last else None
+            }
+        }
+
+
+def get_client(params):
+    kwargs = {
+        "host": params["login_host"],
+        "port": int(params["login_port"]),
+        "directConnection": True,
+        "serverSelectionTimeoutMS": params["timeout"] * 1000
+    }
+
+    if params["tls"]:
+        kwargs["tls"] = True
+        kwargs["tlsAllowInvalidCertificates"] = params["tls_allow_invalid_certificates"]
+        kwargs["tlsAllowInvalidHostnames"] = params["tls_allow_invalid_certificates"]
+
+    if params["login_user"]:
+        kwargs["username"] = params["login_user"]
+        kwargs["password"] = params["login_password"]
+        kwargs["authSource"] = params["login_database"]
+
+    return MongoClient(**kwargs)
+
+
+def bootstrap_admin(params):
+    """
+    Initiate a fresh node and create the root user over an unauthenticated
+    connection (localhost exception). Once any user exists the exception
+    closes, so reruns only see Unauthorized and leave the rest to the
+    authenticated connection.
+    """
+    replica_set = ReplicaSet(get_client(dict(params, login_user=None)), params["timeout"])
+    added = []
+    created = False
+
+    try:
+        # hello needs no authentication - a node without setName is not initiated
+        if not replica_set.admin.command("hello").get("setName"):
+            if not params["members"]:
+                raise Exception("replica set is not initiated and no members were given")
+
+            replica_set.initiate(params["replica_set"], params["members"], params["settings"])
+            added = [member["host"] for member in params["members"]]
+
+        try:
+            replica_set.admin.command("createUser", params["login_user"], pwd=params["login_password"],
+                                      roles=[{"role": "root", "db": "admin"}])
+            created = True
+        except OperationFailure as error:
+            if error.code not in [UNAUTHORIZED, USER_ALREADY_EXISTS]:
+                raise
+    finally:
+        replica_set.client.close()
+
+    return added, created
+
+
+def connect_primary(params):
+    """
+    Connect directly to the current primary - member priorities (app-local
+    AZ placement) can move it off the host the module runs on.
+    """
+    replica_set = ReplicaSet(get_client(params), params["timeout"])
+
+    if replica_set.get_config() is None:
+        return replica_set
+
+    replica_set.wait_until(lambda: replica_set.admin.command("hello").get("primary"), "a primary")
+    hello = replica_set.admin.command("hello")
+
+    if hello.get("isWritablePrimary"):
+        return replica_set
+
+    host, port = hello["primary"].rsplit(":", 1)
+    replica_set.client.close()
+
+    return ReplicaSet(get_client(dict(params, login_host=host, login_port=int(port))), params["timeout"])
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            login_host=dict(type="str", default="localhost"),
+            login_port=dict(type="int", default=27017),
+            login_user=dict(type="str"),
+            login_password=dict(type="str", no_log=True),
+            login_database=dict(type="str", default="admin"),
+            tls=dict(type="bool", default=True),
+            tls_allow_invalid_certificates=dict(type="bool", default=True),
+            replica_set=dict(type="str", default="rs0"),
+            members=dict(type="list", elements="dict", default=[]),
+            settings=dict(type="dict"),
+            wait_healthy=dict(type="bool", default=True),
+            verify_replication=dict(type="bool", default=True),
+            timeout=dict(type="int", default=120),
+            max_lag_seconds=dict(type="int", default=10),
+            seed_timestamp=dict(type="float"),
+            seed_min_headroom=dict(type="int", default=3600),
+            create_admin=dict(type="bool", default=False)
+        ),
+        supports_check_mode=False
+    )
+
+    if not HAS_PYMONGO:
+        module.fail_json(msg=missing_required_lib("pymongo"), exception=PYMONGO_IMPORT_ERROR)
+
+    params = module.params
+    started = time.time()
+    result = {"changed": False, "added": [], "updated": [], "replication_verified": None, "admin_created": False}
+
+    if params["create_admin"] and not params["login_user"]:
+        module.fail_json(msg="create_admin needs login_user and login_password")
+
+    try:
+        if params["create_admin"]:
+            result["added"], result["admin_created"] = bootstrap_admin(params)
+            result["changed"] = bool(result["added"] or result["admin_created"])
+
+        replica_set = connect_primary(params)
+
+        if replica_set.get_config() is None:
+            if not params["members"]:
+                module.fail_json(msg="replica set is not initiated and no members were given")
+            replica_set.initiate(params["replica_set"], params["members"], params["settings"])
+            result["changed"] = True
+            result["added"] = [member["host"] for member in params["members"]]
+        elif params["members"]:
+            # seeded members must be able to resume from the snapshot - check
+            # before the reconfig, a stale member cannot be undone cleanly
+            if params["seed_timestamp"] and replica_set.missing_members(params["members"]):
+                result["seed"] = replica_set.check_seed(params["seed_timestamp"],
+                                                        params["seed_min_headroom"],
+                                                        params["max_lag_seconds"])
+
+            result["added"] += replica_set.add_members(params["members"])
+            result["updated"] = replica_set.update_members(params["members"])
+            result["changed"] = bool(result["changed"] or result["added"] or result["updated"])
+
+            # a priority change can hand the primary to another member
+            if result["updated"]:
+                replica_set.client.close()
+                replica_set = connect_primary(params)
+
+        if params["wait_healthy"]:
+            replica_set.wait_healthy(max(len(params["members"]), 1))
+
+        if params["verify_replication"]:
+            result["replication_verified"] = replica_set.verify_replication()
+
+        result.update(replica_set.summary(params["max_lag_seconds"]))
+
+    except Exception as error:
+        result["elapsed_seconds"] = time.time() - started
+        module.fail_json(msg=f"replica set bootstrap failed: {error}", **result)
+
+    result["elapsed_seconds"] = time.time() - started
+    module.exit_json(**result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,626 @@
+#!/usr/bin/python3
+"""
+MongoDB backup from a secondary.
+
+Picks the member with the least impact on the application: the analytics
+member (tags workload: analytics), then a hidden member, then the lowest
+priority secondary.  It never picks the primary unless allowed.
+
+dump streams "mongodump --archive --oplog" with parallel collections
+through zstd or gzip into fixed size chunks, each with a sha256.  The
+manifest is written last, so a backup directory without one is
+incomplete.  verify re-reads the chunks against the manifest.
+restore-test restores a backup into a scratch mongod and records the
+restore throughput.  lock and unlock bracket an EBS snapshot with
+fsyncLock, and lock schedules an automatic unlock in case the snapshot
+never finishes.
+
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure, PyMongoError
+
+MANIFEST = "manifest.json"
+LOCK_MARKER = ".fsync_lock.json"
+UNLOCK_UNIT = "mongodb-backup-unlock"
+
+# read size of the compressed stream - chunks are cut on these boundaries
+BLOCK_SIZE = 4 * 1024 * 1024
+
+EXTENSIONS = {"zstd": "zst", "gzip": "gz"}
+
+# members lagging further behind are not backed up
+MAX_LAG_SECONDS = 300
+
+# mongodump and the compressor yield cpu and disk to the local mongod
+LOW_PRIORITY = ["nice", "-n", "10", "ionice", "-c", "2", "-n", "7"]
+
+RESTORED = re.compile(r"(\d+) document\(s\) restored successfully\. (\d+) document\(s\) failed to restore")
+
+
+class Backup(object):
+
+    def __init__(self, config):
+        self.config = config
+        self.backup_dir = config.get("backup_dir", "/var/backups/mongodb")
+        self.restore_test_dir = config.get("restore_test_dir", "/var/tmp/mongodb-restore-test")
+        self.compressor = config.get("compressor", "zstd")
+        self.parallel_collections = int(config.get("parallel_collections", 4))
+        self.chunk_size = int(config.get("chunk_size_mb", 1024)) * 1024 * 1024
+        self.keep = int(config.get("keep", 3))
+        self._client = None
+
+        if self.compressor not in EXTENSIONS:
+            raise Exception(f"compressor {self.compressor} not supported - choose from {', '.join(EXTENSIONS)}")
+
+    @property
+    def client(self):
+        # one connection to the local member, never routed to the primary
+        if self._client is None:
+            self._client = MongoClient(
+                host=self.config.get("host", "localhost"),
+                port=int(self.config.get("port", 27017)),
+                username=self.config.get("username") or None,
+                password=self.config.get("password") or None,
+                authSource=self.config.get("auth_source", "admin"),
+                tls=self.config.get("tls", True),
+                tlsAllowInvalidCertificates=self.config.get("tls_allow_invalid_certificates", True),
+                directConnection=True,
+                maxPoolSize=1,
+                serverSelectionTimeoutMS=int(self.config.get("timeout", 10)) * 1000,
+                appname="mongodb-backup"
+            )
+
+        return self._client
+
+    def select(self, member=None):
+        """
+        The member to back up - a healthy, current, non-delayed secondary,
+        preferring analytics, then hidden, then the lowest priority.
+        """
+        config = self.client.admin.command("replSetGetConfig")["config"]
+        status = self.client.admin.command("replSetGetStatus")
+
+        states = dict((_member["name"], _member) for _member in status["members"])
+        primary = next((_member for _member in status["members"] if _member["stateStr"] == "PRIMARY"), None)
+
+        candidates = []
+
+        for _member in config["members"]:
+            state = states.get(_member["host"], {})
+
+            if _member.get("arbiterOnly") or _member.get("secondaryDelaySecs", _member.get("slaveDelay", 0)):
+                continue
+
+            if state.get("stateStr") != "SECONDARY" or not state.get("health"):
+                continue
+
+            lag = (primary["optimeDate"] - state["optimeDate"]).total_seconds() if primary else 0
+
+            if lag > MAX_LAG_SECONDS:
+                continue
+
+            candidates.append({
+                "member": _member["host"],
+                "analytics": _member.get("tags", {}).get("workload") == "analytics",
+                "hidden": bool(_member.get("hidden")),
+                "priority": _member.get("priority", 1),
+                "lag_seconds": lag
+            })
+
+        candidates.sort(key=lambda _candidate: (not _candidate["analytics"], not _candidate["hidden"],
+                                                _candidate["priority"], _candidate["lag_seconds"],
+                                                _candidate["member"]))
+
+        if member:
+            candidates = [_candidate for _candidate in candidates if _candidate["member"] == member]
+
+            if not candidates:
+                raise Exception(f"{member} is not a healthy, current, non-delayed secondary")
+
+        if candidates:
+            return candidates[0]
+
+        if self.config.get("allow_primary") and primary and not member:
+            return {"member": primary["name"], "primary": True}
+
+        raise Exception("no healthy secondary to back up - the primary is only used with allow_primary")
+
+    def is_selected(self):
+        return self.select()["member"] == self.client.admin.command("hello").get("me")
+
+    def _check_not_primary(self):
+        if self.client.admin.command("hello").get("isWritablePrimary") and not self.config.get("allow_primary"):
+            raise Exception("refusing to back up the primary - run on a secondary or set allow_primary")
+
+    def _backups(self):
+        # completed backups, oldest first
+        if not os.path.isdir(self.backup_dir):
+            return []
+
+        return sorted(os.path.join(self.backup_dir, name) for name in os.listdir(self.backup_dir)
+                      if os.path.isfile(os.path.join(self.backup_dir, name, MANIFEST)))
+
+    def _resolve(self, backup):
+        if backup:
+            return backup if os.path.isabs(backup) else os.path.join(self.backup_dir, backup)
+
+        backups = self._backups()
+
+        if not backups:
+            raise Exception(f"no completed backup in {self.backup_dir}")
+
+        return backups[-1]
+
+    @staticmethod
+    def _read_manifest(backup):
+        with open(os.path.join(backup, MANIFEST)) as manifest_file:
+            return json.load(manifest_file)
+
+    @staticmethod
+    def _write_manifest(backup, manifest):
+        path = os.path.join(backup, MANIFEST)
+
+        with open(f"{path}.tmp", "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+        os.replace(f"{path}.tmp", path)
+
+    def _compress_command(self):
+        if self.compressor == "zstd":
+            return ["zstd", "-q", "-3", "-T0", "-c"]
+
+        # pigz compresses on every core, gzip on one
+        if shutil.which("pigz"):
+            return ["pigz", "-c"]
+
+        return ["gzip", "-c"]
+
+    def _decompress_command(self, compressor):
+        if compressor == "zstd":
+            return ["zstd", "-q", "-d", "-c"]
+
+        return ["pigz" if shutil.which("pigz") else "gzip", "-d", "-c"]
+
+    def _tool_auth(self, directory):
+        # the password goes through a 0600 --config file, never argv
+        fd, path = tempfile.mkstemp(prefix=".tool-", suffix=".yaml", dir=directory)
+
+        with os.fdopen(fd, "w") as config_file:
+            config_file.write(f"password: {json.dumps(self.config.get('password') or '')}\n")
+
+        args = ["--host", self.config.get("host", "localhost"),
+                "--port", str(self.config.get("port", 27017)),
+                "--username", self.config.get("username") or "",
+                "--authenticationDatabase", self.config.get("auth_source", "admin"),
+                "--config", path]
+
+        if self.config.get("tls", True):
+            args.append("--tls")
+
+            if self.config.get("tls_allow_invalid_certificates", True):
+                args.append("--tlsInsecure")
+
+        return args, path
+
+    @staticmethod
+    def _reap(*processes):
+        # kill what is still running of a pipeline that failed part way and
+        # wait on every stage, so no child outlives the command
+        for process in processes:
+            if process is None:
+                continue
+
+            if process.poll() is None:
+                process.kill()
+
+            process.wait()
+
+    def dump(self):
+        self._check_not_primary()
+
+        name = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        partial = os.path.join(self.backup_dir, f".{name}.partial")
+        backup = os.path.join(self.backup_dir, name)
+        os.makedirs(partial, mode=0o700)
+
+        auth, auth_path = self._tool_auth(partial)
+        extension = EXTENSIONS[self.compressor]
+
+        dump_command = LOW_PRIORITY + ["mongodump"] + auth + [
+            "--readPreference", "secondaryPreferred",
+            "--archive",
+            "--oplog",
+            "--numParallelCollections", str(self.parallel_collections),
+            "--quiet"
+        ]
+
+        started = time.time()
+        chunks = []
+        total = hashlib.sha256()
+        total_bytes = 0
+        chunk_file = None
+
+        try:
+            with open(os.path.join(partial, "mongodump.log"), "w") as log_file:
+                dump = subprocess.Popen(dump_command, stdout=subprocess.PIPE, stderr=log_file)
+                compress = None
+
+                try:
+                    compress = subprocess.Popen(LOW_PRIORITY + self._compress_command(),
+                                                stdin=dump.stdout, stdout=subprocess.PIPE)
+                    dump.stdout.close()
+
+                    while True:
+                        block = compress.stdout.read(BLOCK_SIZE)
+
+                        if not block:
+                            break
+
+                        while block:
+                            if chunk_file is None or chunks[-1]["bytes"] >= self.chunk_size:
+                                if chunk_file:
+                                    chunk_file.close()
+                                    chunks[-1]["sha256"] = chunk_hash.hexdigest()
+
+                                chunks.append({"file": f"dump.archive.{extension}.{len(chunks):04d}", "bytes": 0})
+                                chunk_file = open(os.path.join(partial, chunks[-1]["file"]), "wb")
+                                chunk_hash = hashlib.sha256()
+
+                            part = block[:self.chunk_size - chunks[-1]["bytes"]]
+                            block = block[len(part):]
+
+                            chunk_file.write(part)
+                            chunk_hash.update(part)
+                            total.update(part)
+                            chunks[-1]["bytes"] += len(part)
+                            total_bytes += len(part)
+
+                    if chunk_file:
+                        chunk_file.close()
+                        chunks[-1]["sha256"] = chunk_hash.hexdigest()
+
+                    if compress.wait() != 0:
+                        raise Exception(f"{self.compressor} exited with {compress.returncode}")
+
+                    if dump.wait() != 0:
+                        with open(os.path.join(partial, "mongodump.log")) as log:
+                            raise Exception(f"mongodump exited with {dump.returncode}: {log.read()[-2000:].strip()}")
+                finally:
+                    self._reap(compress, dump)
+
+            for chunk in chunks:
+                with open(os.path.join(partial, chunk["file"]), "rb") as chunk_file:
+                    os.fsync(chunk_file.fileno())
+
+        except BaseException:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
+        finally:
+            if os.path.exists(auth_path):
+                os.remove(auth_path)
+
+        seconds = time.time() - started
+        hello = self.client.admin.command("hello")
+
+        manifest = {
+            "name": name,
+            "method": "mongodump",
+            "member": hello.get("me"),
+            "replica_set": hello.get("setName"),
+            "compressor": self.compressor,
+            "parallel_collections": self.parallel_collections,
+            "oplog": True,
+            "started": started,
+            "seconds": round(seconds, 1),
+            "bytes": total_bytes,
+            "throughput_mb_s": round(total_bytes / 1048576.0 / seconds, 1) if seconds else None,
+            "sha256": total.hexdigest(),
+            "chunks": chunks
+        }
+
+        self._write_manifest(partial, manifest)
+        os.rename(partial, backup)
+
+        self.prune()
+
+        return dict(manifest, path=backup)
+
+    def prune(self):
+        # keep the newest completed backups, drop older ones and leftovers
+        # of interrupted dumps
+        backups = self._backups()
+        removed = []
+
+        for backup in backups[:max(len(backups) - self.keep, 0)]:
+            shutil.rmtree(backup)
+            removed.append(backup)
+
+        for name in os.listdir(self.backup_dir):
+            path = os.path.join(self.backup_dir, name)
+
+            if name.endswith(".partial") and time.time() - os.path.getmtime(path) > 86400:
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(path)
+
+        return removed
+
+    def _read_chunks(self, backup, manifest):
+        """Yield the compressed stream, checking every chunk on the way."""
+        total = hashlib.sha256()
+
+        for chunk in manifest["chunks"]:
+            chunk_hash = hashlib.sha256()
+            size = 0
+
+            with open(os.path.join(backup, chunk["file"]), "rb") as chunk_file:
+                while True:
+                    block = chunk_file.read(BLOCK_SIZE)
+
+                    if not block:
+                        break
+
+                    chunk_hash.update(block)
+                    total.update(block)
+                    size += len(block)
+
+                    yield block
+
+            if size != chunk["bytes"] or chunk_hash.hexdigest() != chunk["sha256"]:
+                raise Exception(f"{chunk['file']} does not match the manifest checksum")
+
+        if total.hexdigest() != manifest["sha256"]:
+            raise Exception(f"{backup} does not match the manifest checksum")
+
+    def verify(self, backup=None):
+        backup = self._resolve(backup)
+        manifest = self._read_manifest(backup)
+
+        started = time.time()
+
+        for _ in self._read_chunks(backup, manifest):
+            pass
+
+        return {
+            "path": backup,
+            "chunks": len(manifest["chunks"]),
+            "bytes": manifest["bytes"],
+            "verified": True,
+            "seconds": round(time.time() - started, 1)
+        }
+
+    def restore_test(self, backup=None):
+        """
+        Restore into a scratch mongod on this host and time it - proves the
+        backup restores and measures the restore throughput.
+        """
+        backup = self._resolve(backup)
+        manifest = self._read_manifest(backup)
+
+        # the scratch mongod's data lives apart from the dumps and from the
+        # member's dbPath - on a tmp volume when one is mounted there
+        os.makedirs(self.restore_test_dir, mode=0o700, exist_ok=True)
+        scratch = os.path.join(self.restore_test_dir, os.path.basename(backup))
+        port = int(self.config.get("restore_test_port", 27217))
+
+        # restored data and indexes take several times the compressed size
+        free = shutil.disk_usage(self.restore_test_dir).free
+        if free < manifest["bytes"] * 4:
+            result = {"skipped": f"{free} bytes free, {manifest['bytes'] * 4} needed"}
+            manifest["restore_test"] = result
+            self._write_manifest(backup, manifest)
+            return dict(result, path=backup)
+
+        shutil.rmtree(scratch, ignore_errors=True)
+        os.makedirs(os.path.join(scratch, "db"), mode=0o700)
+
+        mongod = subprocess.Popen(LOW_PRIORITY + [
+            "mongod",
+            "--dbpath", os.path.join(scratch, "db"),
+            "--port", str(port),
+            "--bind_ip", "127.0.0.1",
+            "--nounixsocket",
+            "--wiredTigerCacheSizeGB", str(self.config.get("restore_test_cache_gb", 1)),
+            "--logpath", os.path.join(scratch, "mongod.log")
+        ])
+
+        try:
+            scratch_client = MongoClient(host="127.0.0.1", port=port, directConnection=True,
+                                         serverSelectionTimeoutMS=60000)
+            scratch_client.admin.command("ping")
+
+            restore_command = LOW_PRIORITY + [
+                "mongorestore",
+                "--host", "127.0.0.1",
+                "--port", str(port),
+                "--archive",
+                "--oplogReplay",
+                "--numParallelCollections", str(self.parallel_collections),
+                "--numInsertionWorkersPerCollection", str(self.config.get("restore_test_insertion_workers", 2))
+            ]
+
+            started = time.time()
+
+            with open(os.path.join(scratch, "mongorestore.log"), "w+") as log_file:
+                restore = subprocess.Popen(restore_command, stdin=subprocess.PIPE, stderr=log_file)
+                decompress = None
+
+                try:
+                    decompress = subprocess.Popen(self._decompress_command(manifest["compressor"]),
+                                                  stdin=subprocess.PIPE, stdout=restore.stdin)
+                    restore.stdin.close()
+
+                    try:
+                        for block in self._read_chunks(backup, manifest):
+                            decompress.stdin.write(block)
+                    finally:
+                        decompress.stdin.close()
+
+                    if decompress.wait() != 0:
+                        raise Exception(f"{manifest['compressor']} exited with {decompress.returncode}")
+
+                    if restore.wait() != 0:
+                        raise Exception(f"mongorestore exited with {restore.returncode}")
+                finally:
+                    self._reap(decompress, restore)
+
+                log_file.seek(0)
+                counts = RESTORED.findall(log_file.read())
+
+            seconds = time.time() - started
+            restored, failed = [int(count) for count in counts[-1]] if counts else [None, None]
+
+            result = {
+                "seconds": round(seconds, 1),
+                "documents": restored,
+                "failed": failed,
+                "throughput_mb_s": round(manifest["bytes"] / 1048576.0 / seconds, 1) if seconds else None,
+                "documents_per_second": round(restored / seconds) if restored and seconds else None
+            }
+
+        finally:
+            mongod.terminate()
+            mongod.wait()
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        manifest["restore_test"] = result
+        self._write_manifest(backup, manifest)
+
+        if failed:
+            raise Exception(f"{failed} documents failed to restore from {backup}")
+
+        return dict(result, path=backup)
+
+    def lock(self, auto_unlock_minutes, config_path):
+        """fsyncLock this secondary for a consistent EBS snapshot."""
+        self._check_not_primary()
+
+        self.client.admin.command("fsync", 1, lock=True)
+
+        with open(os.path.join(self.backup_dir, LOCK_MARKER), "w") as marker:
+            json.dump({"locked": time.time(), "member": self.client.admin.command("hello").get("me")}, marker)
+
+        # a failed snapshot must not leave the member locked
+        if auto_unlock_minutes:
+            subprocess.run(["systemctl", "stop", f"{UNLOCK_UNIT}.timer"], stderr=subprocess.DEVNULL)
+            subprocess.run(["systemctl", "reset-failed", f"{UNLOCK_UNIT}.service"], stderr=subprocess.DEVNULL)
+            subprocess.run(["systemd-run", "--unit", UNLOCK_UNIT, f"--on-active={auto_unlock_minutes}min",
+                            sys.executable, os.path.abspath(__file__), "--config", config_path, "unlock"],
+                           check=True)
+
+        return {"locked": True, "auto_unlock_minutes": auto_unlock_minutes}
+
+    def unlock(self):
+        unlocked = 0
+
+        while True:
+            try:
+                response = self.client.admin.command("fsyncUnlock")
+            except OperationFailure:
+                # not locked (any more)
+                break
+
+            unlocked += 1
+
+            if not response.get("lockCount"):
+                break
+
+        marker = os.path.join(self.backup_dir, LOCK_MARKER)
+        if os.path.exists(marker):
+            os.remove(marker)
+
+        subprocess.run(["systemctl", "stop", f"{UNLOCK_UNIT}.timer"], stderr=subprocess.DEVNULL)
+
+        return {"unlocked": unlocked > 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MongoDB backup from a secondary")
+    parser.add_argument("--config", default="/etc/mongodb/backup.json",
+                        help="JSON file with the connection and backup settings")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    select = commands.add_parser("select", help="print the member to back up")
+    select.add_argument("--member", help="check this host:port instead of picking one")
+
+    dump = commands.add_parser("dump", help="compressed, chunked mongodump of this member")
+    dump.add_argument("--if-selected", action="store_true",
+                      help="only dump when this member is the one select picks (timers on every member)")
+    dump.add_argument("--verify", action="store_true", help="verify the chunks after the dump")
+    dump.add_argument("--restore-test", action="store_true", help="restore the dump into a scratch mongod")
+
+    for command in ["verify", "restore-test"]:
+        commands.add_parser(command).add_argument("backup", nargs="?", help="backup name (default: latest)")
+
+    lock = commands.add_parser("lock", help="fsyncLock this member for a snapshot")
+    lock.add_argument("--auto-unlock-minutes", type=int, default=30)
+
+    commands.add_parser("unlock", help="release the fsyncLock")
+    commands.add_parser("prune", help="remove backups beyond the retention")
+
+    args = parser.parse_args(argv)
+
+    with open(args.config) as config_file:
+        backup = Backup(json.load(config_file))
+
+    try:
+        if args.command == "select":
+            result = backup.select(args.member)
+        elif args.command == "dump":
+            if args.if_selected and not backup.is_selected():
+                result = {"skipped": "not the selected backup member"}
+            else:
+                result = backup.dump()
+
+                if args.verify:
+                    result["verify"] = backup.verify(result["path"])
+
+                if args.restore_test:
+                    result["restore_test"] = backup.restore_test(result["path"])
+        elif args.command == "verify":
+            result = backup.verify(args.backup)
+        elif args.command == "restore-test":
+            result = backup.restore_test(args.backup)
+        elif args.command == "lock":
+            result = backup.lock(args.auto_unlock_minutes, os.path.abspath(args.config))
+        elif args.command == "unlock":
+            result = backup.unlock()
+        else:
+            result = {"removed": backup.prune()}
+    except (Exception, PyMongoError) as error:
+        print(json.dumps({"failed": True, "msg": str(error)}))
+        return 1
+
+    print(json.dumps(result, default=str))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
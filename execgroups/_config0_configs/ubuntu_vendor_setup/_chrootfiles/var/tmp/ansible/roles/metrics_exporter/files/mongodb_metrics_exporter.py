@@ -0,0 +1,399 @@
+#!/usr/bin/python3
+"""
+MongoDB metrics exporter.
+
+Samples serverStatus, replSetGetStatus, the WiredTiger cache, opcounters,
+connections and the oplog window of the local mongod every interval over
+one long-lived pymongo connection, and serves the last sample in the
+Prometheus text format.  Scrapes never touch mongod, so scrape frequency
+does not add load to the member.
+
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+MEMBER_STATES = {
+    0: "STARTUP",
+    1: "PRIMARY",
+    2: "SECONDARY",
+    3: "RECOVERING",
+    5: "STARTUP2",
+    6: "UNKNOWN",
+    7: "ARBITER",
+    8: "DOWN",
+    9: "ROLLBACK",
+    10: "REMOVED"
+}
+
+# serverStatus wiredTiger.cache counters - application thread evictions
+# are the stall signal: user operations doing eviction work themselves
+WT_CACHE_GAUGES = {
+    "bytes currently in the cache": "total",
+    "tracked dirty bytes in the cache": "dirty",
+    "maximum bytes configured": "max"
+}
+
+WT_CACHE_COUNTERS = {
+    "pages evicted by application threads": ("mongodb_wiredtiger_cache_application_evictions_total",
+                                             "Pages evicted by application threads (eviction stalls)"),
+    "modified pages evicted": ("mongodb_wiredtiger_cache_modified_evictions_total",
+                               "Modified pages evicted from the cache"),
+    "unmodified pages evicted": ("mongodb_wiredtiger_cache_unmodified_evictions_total",
+                                 "Unmodified pages evicted from the cache"),
+    "bytes read into cache": ("mongodb_wiredtiger_cache_read_bytes_total",
+                              "Bytes read into the cache"),
+    "bytes written from cache": ("mongodb_wiredtiger_cache_written_bytes_total",
+                                 "Bytes written from the cache")
+}
+
+
+def log(message):
+    # journald picks up stderr of the unit
+    print(message, file=sys.stderr, flush=True)
+
+
+class Metrics(object):
+    """Metric families in exposition order."""
+
+    def __init__(self):
+        self.families = {}
+
+    def add(self, name, kind, description, value, **labels):
+        if value is None:
+            return
+
+        family = self.families.setdefault(name, {"kind": kind, "description": description, "samples": []})
+        # bools as 0/1 - ints are not cast, 64 bit counters keep their precision
+        family["samples"].append((labels, int(value) if isinstance(value, bool) else value))
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+
+        pairs = []
+        for key in sorted(labels):
+            value = str(labels[key]).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            pairs.append(f'{key}="{value}"')
+
+        return "{" + ",".join(pairs) + "}"
+
+    def render(self):
+        lines = []
+
+        for name, family in self.families.items():
+            lines.append(f"# HELP {name} {family['description']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+
+            for labels, value in family["samples"]:
+                lines.append(f"{name}{self._labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+class Collector(object):
+    """One sample of the local member over the shared client."""
+
+    def __init__(self, client):
+        self.client = client
+        self.admin = client.admin
+
+    def server_status(self, metrics, status):
+        metrics.add("mongodb_uptime_seconds", "gauge", "Seconds since mongod started", status.get("uptime"))
+
+        connections = status.get("connections", {})
+        for state in ["current", "available", "active"]:
+            metrics.add("mongodb_connections", "gauge", "Client connections by state",
+                        connections.get(state), state=state)
+        metrics.add("mongodb_connections_created_total", "counter", "Connections created since startup",
+                    connections.get("totalCreated"))
+
+        for kind, value in status.get("opcounters", {}).items():
+            metrics.add("mongodb_opcounters_total", "counter", "Operations since startup by type",
+                        value, type=kind)
+
+        for kind, value in status.get("opcountersRepl", {}).items():
+            metrics.add("mongodb_opcounters_repl_total", "counter", "Replicated operations applied since startup by type",
+                        value, type=kind)
+
+        network = status.get("network", {})
+        metrics.add("mongodb_network_bytes_total", "counter", "Network bytes by direction",
+                    network.get("bytesIn"), direction="in")
+        metrics.add("mongodb_network_bytes_total", "counter", "Network bytes by direction",
+                    network.get("bytesOut"), direction="out")
+
+        memory = status.get("mem", {})
+        for kind in ["resident", "virtual"]:
+            if memory.get(kind) is not None:
+                metrics.add("mongodb_memory_bytes", "gauge", "Process memory by type",
+                            memory[kind] * 1024 * 1024, type=kind)
+
+        queue = status.get("globalLock", {}).get("currentQueue", {})
+        for kind in ["readers", "writers"]:
+            metrics.add("mongodb_global_lock_queue", "gauge", "Operations queued for the global lock",
+                        queue.get(kind), type=kind)
+
+        # 7.0 admission control moved the tickets to queues.execution
+        tickets = status.get("queues", {}).get("execution") or \
+            status.get("wiredTiger", {}).get("concurrentTransactions", {})
+        for kind in ["read", "write"]:
+            metrics.add("mongodb_wiredtiger_tickets_available", "gauge", "Storage engine tickets available",
+                        tickets.get(kind, {}).get("available"), type=kind)
+            metrics.add("mongodb_wiredtiger_tickets_out", "gauge", "Storage engine tickets in use",
+                        tickets.get(kind, {}).get("out"), type=kind)
+
+        self.wiredtiger_cache(metrics, status.get("wiredTiger", {}).get("cache", {}))
+
+    @staticmethod
+    def wiredtiger_cache(metrics, cache):
+        if not cache:
+            return
+
+        for key, kind in WT_CACHE_GAUGES.items():
+            metrics.add("mongodb_wiredtiger_cache_bytes", "gauge", "WiredTiger cache bytes by type",
+                        cache.get(key), type=kind)
+
+        for key, (name, description) in WT_CACHE_COUNTERS.items():
+            metrics.add(name, "counter", description, cache.get(key))
+
+        maximum = cache.get("maximum bytes configured")
+        if maximum:
+            # eviction workers target 80% full and 5% dirty, application
+            # threads are pulled in at 95% and 20%
+            metrics.add("mongodb_wiredtiger_cache_fill_ratio", "gauge", "Cache bytes over the configured maximum",
+                        cache.get("bytes currently in the cache", 0) / maximum)
+            metrics.add("mongodb_wiredtiger_cache_dirty_ratio", "gauge", "Dirty cache bytes over the configured maximum",
+                        cache.get("tracked dirty bytes in the cache", 0) / maximum)
+
+    @staticmethod
+    def replica_set(metrics, status):
+        metrics.add("mongodb_replset_my_state", "gauge", "Replica set state of this member", status.get("myState"))
+        metrics.add("mongodb_replset_term", "gauge", "Current election term", status.get("term"))
+
+        members = status.get("members", [])
+        primary = next((member for member in members if member.get("state") == 1), None)
+        metrics.add("mongodb_replset_has_primary", "gauge", "Whether the member sees a primary", int(bool(primary)))
+
+        # without a primary, lag is measured against the most recent member
+        optimes = [member["optimeDate"] for member in members if member.get("optimeDate")]
+        reference = primary["optimeDate"] if primary and primary.get("optimeDate") else max(optimes or [None])
+
+        lags = []
+        for member in members:
+            name = member.get("name")
+            state = member.get("state")
+
+            metrics.add("mongodb_replset_member_state", "gauge", "Member state (1 primary, 2 secondary, 7 arbiter)",
+                        state, member=name, state=MEMBER_STATES.get(state, "UNKNOWN"))
+            metrics.add("mongodb_replset_member_health", "gauge", "Member health as seen by this node",
+                        member.get("health"), member=name)
+
+            if state != 2 or not member.get("optimeDate") or not reference:
+                continue
+
+            lag = max((reference - member["optimeDate"]).total_seconds(), 0.0)
+            lags.append(lag)
+            metrics.add("mongodb_replset_member_replication_lag_seconds", "gauge",
+                        "Seconds the secondary is behind the primary", lag, member=name)
+
+        if lags:
+            metrics.add("mongodb_replset_max_replication_lag_seconds", "gauge",
+                        "Largest secondary replication lag", max(lags))
+
+    def oplog(self, metrics):
+        oplog = self.client.local["oplog.rs"]
+
+        first = oplog.find_one(sort=[("$natural", 1)], projection={"ts": 1})
+        last = oplog.find_one(sort=[("$natural", -1)], projection={"ts": 1})
+
+        if first and last:
+            metrics.add("mongodb_oplog_window_seconds", "gauge", "Seconds between the oldest and newest oplog entry",
+                        last["ts"].time - first["ts"].time)
+            metrics.add("mongodb_oplog_last_timestamp_seconds", "gauge", "Time of the newest oplog entry",
+                        last["ts"].time)
+
+        stats = self.client.local.command("collStats", "oplog.rs")
+        metrics.add("mongodb_oplog_size_bytes", "gauge", "Oplog size by type", stats.get("size"), type="used")
+        metrics.add("mongodb_oplog_size_bytes", "gauge", "Oplog size by type", stats.get("maxSize"), type="max")
+
+    def sample(self):
+        """Sample every section; a failing section does not hide the others."""
+        metrics = Metrics()
+        started = time.time()
+        errors = 0
+
+        try:
+            status = self.admin.command("serverStatus")
+        except PyMongoError:
+            status = None
+
+        metrics.add("mongodb_up", "gauge", "Whether the last sample reached mongod", int(status is not None))
+
+        if status is not None:
+            try:
+                self.server_status(metrics, status)
+            except Exception as error:
+                log(f"serverStatus section failed: {error!r}")
+                errors += 1
+
+        if status and status.get("repl", {}).get("setName"):
+            for section in [lambda: self.replica_set(metrics, self.admin.command("replSetGetStatus")),
+                            lambda: self.oplog(metrics)]:
+                try:
+                    section()
+                except Exception as error:
+                    # an unexpected document shape is a section error, not
+                    # the end of the sampler
+                    log(f"replica set section failed: {error!r}")
+                    errors += 1
+
+        metrics.add("mongodb_exporter_sample_errors", "gauge", "Sections that failed in the last sample", errors)
+        metrics.add("mongodb_exporter_sample_duration_seconds", "gauge", "Seconds the last sample took",
+                    time.time() - started)
+        metrics.add("mongodb_exporter_last_sample_timestamp_seconds", "gauge", "Time of the last sample", time.time())
+
+        return metrics.render()
+
+
+class Exporter(object):
+    """Background sampler plus the cached exposition served to scrapes."""
+
+    def __init__(self, collector, interval):
+        self.collector = collector
+        self.interval = interval
+        self.text = Metrics().render()
+        self.sampled = None
+        self.failures = 0
+        self.stopped = threading.Event()
+
+    def refresh(self):
+        try:
+            self.text = self.collector.sample()
+            self.sampled = time.time()
+        except Exception as error:
+            # the last good sample is dropped rather than served as current
+            log(f"sample failed: {error!r}")
+            self.failures += 1
+
+            metrics = Metrics()
+            metrics.add("mongodb_up", "gauge", "Whether the last sample reached mongod", 0)
+            self.text = metrics.render()
+
+    def exposition(self):
+        """The cached sample plus the exporter gauges computed at scrape time."""
+        metrics = Metrics()
+        metrics.add("mongodb_exporter_sample_failures_total", "counter", "Samples that raised since startup",
+                    self.failures)
+        # grows without bound if the sampler stops - alert on it
+        if self.sampled is not None:
+            metrics.add("mongodb_exporter_sample_age_seconds", "gauge", "Seconds since the last successful sample",
+                        time.time() - self.sampled)
+
+        return self.text + metrics.render()
+
+    def run(self):
+        while not self.stopped.is_set():
+            started = time.time()
+            try:
+                self.refresh()
+            except Exception as error:
+                log(f"sampler iteration failed: {error!r}")
+            self.stopped.wait(max(self.interval - (time.time() - started), 0))
+
+    def start(self):
+        self.refresh()
+        threading.Thread(target=self.run, name="sampler", daemon=True).start()
+
+    def handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = exporter.exposition().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def get_client(config):
+    # one connection to the local member, never routed to the primary
+    return MongoClient(
+        host=config.get("host", "localhost"),
+        port=int(config.get("port", 27017)),
+        username=config.get("username") or None,
+        password=config.get("password") or None,
+        authSource=config.get("auth_source", "admin"),
+        tls=config.get("tls", True),
+        tlsAllowInvalidCertificates=config.get("tls_allow_invalid_certificates", True),
+        directConnection=True,
+        maxPoolSize=1,
+        serverSelectionTimeoutMS=int(config.get("timeout", 5)) * 1000,
+        appname="mongodb-metrics-exporter"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MongoDB Prometheus metrics exporter")
+    parser.add_argument("--config", default="/etc/mongodb/metrics_exporter.json",
+                        help="JSON file with the connection and listen settings")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as config_file:
+        config = json.load(config_file)
+
+    exporter = Exporter(Collector(get_client(config)), float(config.get("interval", 15)))
+    exporter.start()
+
+    server = ThreadingHTTPServer((config.get("listen_address", "127.0.0.1"), int(config.get("listen_port", 9216))),
+                                 exporter.handler())
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stopped.set()
+        server.server_close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Tests for the MongoDB metrics exporter against a stub of the local mongod.
+
+The stub answers serverStatus, replSetGetStatus, collStats and the oplog
+lookups with fixed documents, so the sampler runs without a server.
+
+Run with:  python3 -m pytest roles/metrics_exporter/tests
+"""
+
+import os
+import sys
+import datetime
+
+import pytest
+
+from pymongo.errors import ServerSelectionTimeoutError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "files"))
+
+from mongodb_metrics_exporter import Collector, Exporter, Metrics  # noqa: E402
+
+NOW = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+SERVER_STATUS = {
+    "uptime": 3600,
+    "connections": {"current": 12, "available": 800, "active": 3, "totalCreated": 40},
+    "opcounters": {"insert": 10, "query": 20},
+    "network": {"bytesIn": 1000, "bytesOut": 2000},
+    "mem": {"resident": 2, "virtual": 4},
+    "repl": {"setName": "rs0"},
+    "wiredTiger": {"cache": {"maximum bytes configured": 1000,
+                             "bytes currently in the cache": 500,
+                             "tracked dirty bytes in the cache": 50}}
+}
+
+REPLSET_STATUS = {
+    "myState": 1,
+    "term": 3,
+    "members": [
+        {"name": "node0:27017", "state": 1, "health": 1, "optimeDate": NOW},
+        {"name": "node1:27017", "state": 2, "health": 1, "optimeDate": NOW - datetime.timedelta(seconds=4)},
+        {"name": "node2:27017", "state": 8, "health": 0}
+    ]
+}
+
+
+class Timestamp(object):
+
+    def __init__(self, time):
+        self.time = time
+
+
+class Oplog(object):
+
+    def __init__(self, first=1000, last=4600):
+        self.first = first
+        self.last = last
+
+    def find_one(self, sort=None, projection=None):
+        time = self.first if sort[0][1] == 1 else self.last
+        return {"_id": 1, "ts": Timestamp(time)} if time is not None else {"_id": 1}
+
+
+class Database(object):
+
+    def __init__(self, replies, oplog=None):
+        self.replies = replies
+        self.oplog = oplog or Oplog()
+
+    def command(self, name, *args):
+        reply = self.replies[name]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def __getitem__(self, collection):
+        return self.oplog
+
+
+class StubClient(object):
+    """Answers the commands the collector runs against the local member."""
+
+    def __init__(self, oplog=None, **replies):
+        commands = {"serverStatus": SERVER_STATUS,
+                    "replSetGetStatus": REPLSET_STATUS,
+                    "collStats": {"size": 100, "maxSize": 1000}}
+        commands.update(replies)
+
+        self.admin = Database(commands)
+        self.local = Database(commands, oplog)
+
+
+def samples(text, name):
+    return [line for line in text.splitlines() if line.startswith(name + " ") or line.startswith(name + "{")]
+
+
+def test_render_families():
+    metrics = Metrics()
+    metrics.add("mongodb_connections", "gauge", "Client connections by state", 5, state="current")
+    metrics.add("mongodb_connections", "gauge", "Client connections by state", 7, state="available")
+    metrics.add("mongodb_missing", "gauge", "Dropped", None)
+
+    assert metrics.render() == (
+        "# HELP mongodb_connections Client connections by state\n"
+        "# TYPE mongodb_connections gauge\n"
+        'mongodb_connections{state="current"} 5\n'
+        'mongodb_connections{state="available"} 7\n'
+    )
+
+
+def test_render_labels_and_bools():
+    metrics = Metrics()
+    metrics.add("mongodb_flag", "gauge", "A flag", True, member='a"b\\c\nd', type="x")
+
+    assert metrics.render().splitlines()[-1] == 'mongodb_flag{member="a\\"b\\\\c\\nd",type="x"} 1'
+
+
+def test_sample_replica_set_member():
+    text = Collector(StubClient()).sample()
+
+    assert samples(text, "mongodb_up") == ["mongodb_up 1"]
+    assert samples(text, "mongodb_replset_has_primary") == ["mongodb_replset_has_primary 1"]
+    assert samples(text, "mongodb_replset_max_replication_lag_seconds") == \
+        ["mongodb_replset_max_replication_lag_seconds 4.0"]
+    assert samples(text, "mongodb_oplog_window_seconds") == ["mongodb_oplog_window_seconds 3600"]
+    assert samples(text, "mongodb_wiredtiger_cache_fill_ratio") == ["mongodb_wiredtiger_cache_fill_ratio 0.5"]
+    assert samples(text, "mongodb_exporter_sample_errors") == ["mongodb_exporter_sample_errors 0"]
+
+
+def test_sample_mongod_down():
+    text = Collector(StubClient(serverStatus=ServerSelectionTimeoutError("no server"))).sample()
+
+    assert samples(text, "mongodb_up") == ["mongodb_up 0"]
+    assert not samples(text, "mongodb_replset_my_state")
+
+
+def test_sample_unexpected_errors_are_section_errors():
+    # a KeyError from an oplog entry without ts must not escape the sample
+    client = StubClient(oplog=Oplog(first=None, last=None))
+
+    text = Collector(client).sample()
+
+    assert samples(text, "mongodb_up") == ["mongodb_up 1"]
+    assert samples(text, "mongodb_exporter_sample_errors") == ["mongodb_exporter_sample_errors 1"]
+
+
+class FailingCollector(object):
+
+    def sample(self):
+        raise RuntimeError("unexpected")
+
+
+def test_exporter_survives_failed_sample():
+    exporter = Exporter(Collector(StubClient()), 15)
+    exporter.refresh()
+    assert samples(exporter.exposition(), "mongodb_exporter_sample_age_seconds")
+
+    exporter.collector = FailingCollector()
+    exporter.refresh()
+    text = exporter.exposition()
+
+    assert samples(text, "mongodb_up") == ["mongodb_up 0"]
+    assert samples(text, "mongodb_exporter_sample_failures_total") == ["mongodb_exporter_sample_failures_total 1"]
+    # the stale replica set sample is not served as current
+    assert not samples(text, "mongodb_replset_my_state")
+
+
+def test_exporter_run_keeps_sampling():
+    exporter = Exporter(FailingCollector(), 0)
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        if len(calls) == 3:
+            exporter.stopped.set()
+        raise RuntimeError("unexpected")
+
+    exporter.refresh = refresh
+    exporter.run()
+
+    assert len(calls) == 3
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,467 @@
+#!/usr/bin/python3
+"""
+Slow operation analyzer for the mongod structured JSON log.
+
+Streams mongod.log and its rotated (optionally gzipped) segments, groups
+the "Slow query" entries by namespace, query shape and plan, and ranks
+index suggestions by the time the offending shapes cost.  Only slow query
+lines are JSON decoded, and the number of tracked shapes is capped, so
+memory stays flat regardless of the log size.
+
+Usage:
+    mongodb-slowlog [/var/log/mongodb] [--since 2025-01-01T00:00]
+                    [--top 20] [--json]
+
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import gzip
+import json
+import glob
+import argparse
+
+# id of the "Slow query" log message since 4.4 - matched on the raw bytes
+# so the other lines are never decoded
+SLOW_QUERY_MARKER = b'"id":51803,'
+
+# operators that make a predicate a range rather than an equality match
+RANGE_OPERATORS = ["$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists", "$not", "$type", "$mod"]
+
+# predicates an index cannot serve
+SKIPPED_OPERATORS = ["$where", "$expr", "$text", "$jsonSchema", "$near", "$nearSphere", "$geoWithin", "$geoIntersects"]
+
+# log-scale duration buckets (ms) for percentiles without keeping samples
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000, 300000]
+
+EXAMPLE_LENGTH = 300
+
+
+def log_files(paths):
+    """Expand files, directories and globs into segments, oldest first."""
+    files = []
+
+    for path in paths:
+        if path == "-":
+            files.append(path)
+        elif os.path.isdir(path):
+            files.extend(name for name in glob.glob(os.path.join(path, "mongod.log*")) if os.path.isfile(name))
+        else:
+            files.extend(glob.glob(path) or [path])
+
+    # rotated segments carry their rotation time in the name, the live log
+    # is newest - mtime orders both
+    return sorted(set(files), key=lambda name: -1 if name == "-" else os.path.getmtime(name))
+
+
+def open_log(path):
+    if path == "-":
+        return sys.stdin.buffer
+
+    with open(path, "rb") as probe:
+        gzipped = probe.read(2) == b"\x1f\x8b"
+
+    return gzip.open(path, "rb") if gzipped else open(path, "rb", buffering=1024 * 1024)
+
+
+def slow_entries(paths, since=None, until=None):
+    """Yield the attr of every slow query entry in the log segments."""
+    for path in log_files(paths):
+        log = open_log(path)
+
+        try:
+            for line in log:
+                if SLOW_QUERY_MARKER not in line:
+                    continue
+
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # truncated line at the end of a segment being written
+                    continue
+
+                timestamp = entry.get("t", {}).get("$date", "")
+                if (since and timestamp < since) or (until and timestamp >= until):
+                    continue
+
+                yield entry.get("attr", {})
+        finally:
+            if log is not sys.stdin.buffer:
+                log.close()
+
+
+def predicate_fields(query, fields=None):
+    """
+    Classify the fields of a query filter.
+
+    Returns:
+        dict: field -> "eq" or "range" (equality wins), or None when the
+        filter has an $or or an operator no index serves
+    """
+    fields = {} if fields is None else fields
+
+    if not isinstance(query, dict):
+        return fields
+
+    for key, value in query.items():
+        if key == "$and":
+            for clause in value:
+                if predicate_fields(clause, fields) is None:
+                    return None
+            continue
+
+        if key in ["$or", "$nor"] or key in SKIPPED_OPERATORS:
+            return None
+
+        if key.startswith("$"):
+            continue
+
+        field = key
+        kind = "eq"
+
+        if isinstance(value, dict) and value and all(name.startswith("$") for name in value):
+            if any(name in SKIPPED_OPERATORS for name in value):
+                return None
+
+            if "$elemMatch" in value:
+                kind = "eq"
+            elif any(name in RANGE_OPERATORS for name in value):
+                kind = "range"
+
+        if fields.get(field) != "eq":
+            fields[field] = kind
+
+    return fields
+
+
+def shape(value):
+    """Replace the literals of a filter with their type, keeping its structure."""
+    if isinstance(value, dict):
+        if len(value) == 1 and next(iter(value)).startswith("$") and next(iter(value)) in \
+                ["$oid", "$date", "$numberLong", "$numberDecimal", "$binary", "$regularExpression", "$timestamp"]:
+            return next(iter(value))[1:]
+        return dict((key, shape(item)) for key, item in value.items())
+
+    if isinstance(value, list):
+        return [shape(item) for item in value[:1]]
+
+    return type(value).__name__
+
+
+def query_parts(attr):
+    """
+    Extract the filter and sort of the operation behind a slow entry.
+
+    Returns:
+        tuple: operation name, filter, sort
+    """
+    command = attr.get("command", {})
+
+    # getMore entries carry the command that opened the cursor
+    if "getMore" in command and isinstance(attr.get("originatingCommand"), dict):
+        command = attr["originatingCommand"]
+
+    if attr.get("type") in ["update", "remove"]:
+        return attr["type"], command.get("q", {}), None
+
+    if "find" in command:
+        return "find", command.get("filter", {}), command.get("sort")
+
+    if "aggregate" in command:
+        # only a leading $match and the $sort right after it can use an index
+        stages = [stage for stage in command.get("pipeline", []) if isinstance(stage, dict)]
+        leading = stages[1:] if stages and "$match" in stages[0] else stages
+        match = stages[0]["$match"] if stages and "$match" in stages[0] else {}
+        return "aggregate", match, leading[0].get("$sort") if leading else None
+
+    if "findAndModify" in command:
+        return "findAndModify", command.get("query", {}), command.get("sort")
+
+    if "count" in command or "distinct" in command:
+        return "count" if "count" in command else "distinct", command.get("query", {}), None
+
+    if "update" in command and command.get("updates"):
+        return "update", command["updates"][0].get("q", {}), None
+
+    if "delete" in command and command.get("deletes"):
+        return "remove", command["deletes"][0].get("q", {}), None
+
+    return next(iter(command), attr.get("type", "unknown")), {}, None
+
+
+def suggest_index(query, sort):
+    """
+    Index key for a filter and sort, ordered equality, sort, range (ESR).
+
+    Returns:
+        list: [(field, direction)] or None when no index applies
+    """
+    fields = predicate_fields(query)
+
+    if fields is None:
+        return None
+
+    key = [(field, 1) for field, kind in fields.items() if kind == "eq"]
+
+    for field, direction in (sort or {}).items():
+        if field not in dict(key) and not field.startswith("$"):
+            key.append((field, -1 if direction in [-1, "-1"] else 1))
+
+    key.extend((field, 1) for field, kind in fields.items() if kind == "range" and field not in dict(key))
+
+    return key or None
+
+
+class Shape(object):
+
+    def __init__(self, ns, op, plan, query_shape, sort, query_hash):
+        self.ns = ns
+        self.op = op
+        self.plan = plan
+        self.query_shape = query_shape
+        self.sort = sort
+        self.query_hash = query_hash
+        self.count = 0
+        self.millis = 0
+        self.max_millis = 0
+        self.docs_examined = 0
+        self.keys_examined = 0
+        self.returned = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.example = None
+        self.index = None
+
+    def add(self, attr, millis):
+        self.count += 1
+        self.millis += millis
+        self.max_millis = max(self.max_millis, millis)
+        self.docs_examined += attr.get("docsExamined", 0)
+        self.keys_examined += attr.get("keysExamined", 0)
+        self.returned += attr.get("nreturned", attr.get("nMatched", 0))
+
+        for index, bound in enumerate(BUCKETS):
+            if millis <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, fraction):
+        target = fraction * self.count
+        seen = 0
+
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min(BUCKETS[index], self.max_millis) if index < len(BUCKETS) else self.max_millis
+
+        return self.max_millis
+
+    @property
+    def scan_ratio(self):
+        return round(self.docs_examined / max(self.returned, 1), 1)
+
+    def needs_index(self, min_ratio):
+        if "COLLSCAN" in self.plan:
+            return True
+
+        return self.docs_examined > self.count and self.scan_ratio >= min_ratio
+
+    def report(self):
+        return {
+            "ns": self.ns,
+            "op": self.op,
+            "plan": self.plan,
+            "query_hash": self.query_hash,
+            "shape": self.query_shape,
+            "sort": self.sort,
+            "count": self.count,
+            "total_ms": self.millis,
+            "mean_ms": round(self.millis / self.count, 1),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max_millis,
+            "docs_examined": self.docs_examined,
+            "keys_examined": self.keys_examined,
+            "returned": self.returned,
+            "docs_examined_per_returned": self.scan_ratio,
+            "example": self.example
+        }
+
+
+class Analyzer(object):
+    """
+    Slow operations grouped by shape.
+
+    At most max_shapes groups are kept: when full, the cheaper half by total
+    time is dropped, so the expensive shapes survive any log size.
+    """
+
+    def __init__(self, max_shapes=10000, min_ratio=100):
+        self.max_shapes = max_shapes
+        self.min_ratio = min_ratio
+        self.shapes = {}
+        self.entries = 0
+        self.dropped = 0
+
+    def add(self, attr):
+        ns = attr.get("ns", "")
+        millis = attr.get("durationMillis", 0)
+
+        op, query, sort = query_parts(attr)
+        plan = attr.get("planSummary", "")
+        query_shape = json.dumps(shape(query), sort_keys=True)
+        sort_shape = json.dumps(sort, sort_keys=True) if sort else None
+
+        key = (ns, op, plan, query_shape, sort_shape)
+        group = self.shapes.get(key)
+
+        if group is None:
+            if len(self.shapes) >= self.max_shapes:
+                self._evict()
+
+            group = self.shapes[key] = Shape(ns, op, plan, query_shape, sort_shape, attr.get("queryHash"))
+            group.example = json.dumps({"filter": query, "sort": sort}, default=str)[:EXAMPLE_LENGTH]
+            group.index = suggest_index(query, sort)
+
+        group.add(attr, millis)
+        self.entries += 1
+
+    def _evict(self):
+        # drop the cheapest half in one pass instead of one shape per insert
+        keep = sorted(self.shapes.items(), key=lambda item: item[1].millis, reverse=True)[:self.max_shapes // 2]
+        self.dropped += len(self.shapes) - len(keep)
+        self.shapes = dict(keep)
+
+    def suggestions(self):
+        """Index suggestions ranked by the time of the shapes they serve."""
+        suggestions = {}
+
+        for group in self.shapes.values():
+            if not group.index or not group.needs_index(self.min_ratio) or "." not in group.ns:
+                continue
+
+            key = (group.ns, tuple(group.index))
+            suggestion = suggestions.setdefault(key, {
+                "ns": group.ns,
+                "index": dict(group.index),
+                "total_ms": 0,
+                "count": 0,
+                "docs_examined": 0,
+                "returned": 0,
+                "plans": set(),
+                "query_hashes": set()
+            })
+
+            suggestion["total_ms"] += group.millis
+            suggestion["count"] += group.count
+            suggestion["docs_examined"] += group.docs_examined
+            suggestion["returned"] += group.returned
+            suggestion["plans"].add(group.plan)
+            if group.query_hash:
+                suggestion["query_hashes"].add(group.query_hash)
+
+        # an index whose key is a prefix of another suggestion on the same
+        # collection is covered by it
+        for key in sorted(suggestions, key=lambda item: len(item[1])):
+            covering = next((other for other in suggestions
+                             if other != key and other[0] == key[0] and other[1][:len(key[1])] == key[1]), None)
+            if covering:
+                for name in ["total_ms", "count", "docs_examined", "returned"]:
+                    suggestions[covering][name] += suggestions[key][name]
+                suggestions[covering]["plans"] |= suggestions[key]["plans"]
+                suggestions[covering]["query_hashes"] |= suggestions[key]["query_hashes"]
+                del suggestions[key]
+
+        ranked = sorted(suggestions.values(), key=lambda item: item["total_ms"], reverse=True)
+
+        for suggestion in ranked:
+            database, collection = suggestion["ns"].split(".", 1)
+            suggestion["plans"] = sorted(suggestion["plans"])
+            suggestion["query_hashes"] = sorted(suggestion["query_hashes"])
+            suggestion["docs_examined_per_returned"] = round(suggestion["docs_examined"] / max(suggestion["returned"], 1), 1)
+            suggestion["command"] = (f'db.getSiblingDB("{database}").getCollection("{collection}")'
+                                     f'.createIndex({json.dumps(suggestion["index"])})')
+
+        return ranked
+
+    def report(self, top):
+        shapes = sorted(self.shapes.values(), key=lambda group: group.millis, reverse=True)
+
+        return {
+            "slow_entries": self.entries,
+            "shapes": len(self.shapes),
+            "shapes_dropped": self.dropped,
+            "collscans": sum(group.count for group in self.shapes.values() if "COLLSCAN" in group.plan),
+            "top_shapes": [group.report() for group in shapes[:top]],
+            "index_suggestions": self.suggestions()[:top]
+        }
+
+
+def print_report(report):
+    print(f"{report['slow_entries']} slow operations, {report['shapes']} shapes "
+          f"({report['shapes_dropped']} dropped), {report['collscans']} collection scans\n")
+
+    print(f"{'total ms':>10} {'count':>7} {'p95 ms':>7} {'ex/ret':>8}  {'plan':<24} ns / op / shape")
+    for group in report["top_shapes"]:
+        print(f"{group['total_ms']:>10} {group['count']:>7} {group['p95_ms']:>7} "
+              f"{group['docs_examined_per_returned']:>8}  {group['plan'][:24]:<24} "
+              f"{group['ns']} {group['op']} {group['shape']}"
+              f"{' sort ' + group['sort'] if group['sort'] else ''}")
+
+    print("\nIndex suggestions (equality, sort, range)")
+    for rank, suggestion in enumerate(report["index_suggestions"], 1):
+        print(f"{rank:>3}. {suggestion['total_ms']} ms over {suggestion['count']} ops, "
+              f"{suggestion['docs_examined_per_returned']} docs examined per returned, "
+              f"{','.join(suggestion['plans'])}")
+        print(f"     {suggestion['command']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Group mongod slow operations by shape and suggest indexes")
+    parser.add_argument("paths", nargs="*", default=["/var/log/mongodb"],
+                        help="log files, rotated/gzipped segments, directories or globs (- for stdin)")
+    parser.add_argument("--since", help="only entries at or after this ISO time (e.g. 2025-01-01T00:00)")
+    parser.add_argument("--until", help="only entries before this ISO time")
+    parser.add_argument("--top", type=int, default=20, help="shapes and suggestions to report")
+    parser.add_argument("--min-ratio", type=float, default=100,
+                        help="docs examined per returned that flags an indexed plan")
+    parser.add_argument("--max-shapes", type=int, default=10000, help="shapes kept in memory")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    # globs that match nothing are left as-is by log_files
+    for path in args.paths:
+        if path != "-" and not os.path.exists(path) and not glob.glob(path):
+            parser.error(f"{path}: no such log file or directory")
+
+    analyzer = Analyzer(max_shapes=args.max_shapes, min_ratio=args.min_ratio)
+
+    for attr in slow_entries(args.paths, since=args.since, until=args.until):
+        analyzer.add(attr)
+
+    report = analyzer.report(args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Ansible filter deriving mongod tuning settings for a host.
+
+    {{ mongodb_instance_type | mongodb_tuning_profile(memtotal_mb=ansible_memtotal_mb,
+                                                      volume_size_gb=mongodb_volume_size_gb,
+                                                      workload=mongodb_workload) }}
+
+returns cache_size_gb, oplog_size_mb, max_incoming_connections and
+journal_commit_interval_ms.  Explicit overrides win over derived values;
+"auto", "", "null" and None mean derive.
+
+Copyright (C) 2025 Gary Leong <gary@config0.com>
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from ansible.errors import AnsibleFilterError
+
+AUTO_VALUES = [None, "", "auto", "null", "None", "none"]
+
+WORKLOADS = {
+    # WiredTiger share of (RAM - 1GB), oplog share of the data volume,
+    # journal commit interval
+    "read_heavy": {"cache_ratio": 0.6, "oplog_ratio": 0.05, "commit_interval_ms": 100},
+    "mixed": {"cache_ratio": 0.5, "oplog_ratio": 0.05, "commit_interval_ms": 100},
+    "write_heavy": {"cache_ratio": 0.45, "oplog_ratio": 0.1, "commit_interval_ms": 200}
+}
+
+# burstable instance memory (GiB) - these do not follow a per vCPU ratio
+BURSTABLE_MEMORY_GB = {
+    "nano": 0.5,
+    "micro": 1,
+    "small": 2,
+    "medium": 4,
+    "large": 8,
+    "xlarge": 16,
+    "2xlarge": 32
+}
+
+# memory (GiB) per vCPU by instance family class
+FAMILY_MEMORY_PER_VCPU_GB = {
+    "c": 2,
+    "m": 4,
+    "r": 8,
+    "x": 16,
+    "z": 8,
+    "i": 8
+}
+
+SIZE_VCPUS = {
+    "medium": 1,
+    "large": 2,
+    "xlarge": 4
+}
+
+# mongod floors/ceilings
+MIN_CACHE_SIZE_GB = 0.25
+MIN_OPLOG_SIZE_MB = 990
+MAX_OPLOG_SIZE_MB = 51200
+MIN_CONNECTIONS = 200
+MAX_CONNECTIONS = 51200  # 80% of LimitNOFILE=64000
+
+
+def _is_auto(value):
+    return value in AUTO_VALUES
+
+
+def instance_memory_gb(instance_type):
+    """
+    Estimate instance memory from an EC2 instance type, e.g. t3.micro or r6i.2xlarge.
+
+    Returns None when the type is not recognised.
+    """
+    try:
+        family, size = str(instance_type).split(".", 1)
+    except ValueError:
+        return None
+
+    if family.startswith("t"):
+        return BURSTABLE_MEMORY_GB.get(size)
+
+    ratio = FAMILY_MEMORY_PER_VCPU_GB.get(family[0])
+    if not ratio:
+        return None
+
+    if size in SIZE_VCPUS:
+        vcpus = SIZE_VCPUS[size]
+    elif size.endswith("xlarge") and size[:-6].isdigit():
+        vcpus = int(size[:-6]) * 4
+    else:
+        return None
+
+    return vcpus * ratio
+
+
+def mongodb_tuning_profile(instance_type, memtotal_mb=None, volume_size_gb=None, workload="mixed",
+                           cache_size_gb=None, oplog_size_mb=None, max_incoming_connections=None,
+                           journal_commit_interval_ms=None):
+    """
+    Derive mongod tuning settings for one host.
+
+    Args:
+        instance_type (str): EC2 instance type, used when memtotal_mb is unknown
+        memtotal_mb (int): Host memory from ansible_memtotal_mb
+        volume_size_gb (int): Size of the MongoDB data volume
+        workload (str): read_heavy, write_heavy or mixed
+        cache_size_gb, oplog_size_mb, max_incoming_connections,
+        journal_commit_interval_ms: explicit overrides
+
+    Returns:
+        dict: tuning settings; oplog_size_mb is None when it cannot be derived
+    """
+    workload = workload if not _is_auto(workload) else "mixed"
+
+    if workload not in WORKLOADS:
+        raise AnsibleFilterError(f"mongodb workload {workload} not supported - choose from {list(WORKLOADS)}")
+
+    settings = WORKLOADS[workload]
+
+    if not _is_auto(memtotal_mb):
+        memory_mb = float(memtotal_mb)
+    elif instance_memory_gb(instance_type):
+        memory_mb = instance_memory_gb(instance_type) * 1024
+    else:
+        raise AnsibleFilterError(f"cannot determine memory for instance type {instance_type} - provide memtotal_mb")
+
+    # WiredTiger default is 50% of (RAM - 1GB) with a 0.25GB floor - never
+    # clamp up to 1GB, which overcommits small instances
+    if _is_auto(cache_size_gb):
+        cache_size_gb = max(round((memory_mb / 1024 - 1) * settings["cache_ratio"], 2),
+                            MIN_CACHE_SIZE_GB)
+
+    if _is_auto(oplog_size_mb) and not _is_auto(volume_size_gb):
+        oplog_size_mb = int(float(volume_size_gb) * 1024 * settings["oplog_ratio"])
+        oplog_size_mb = min(max(oplog_size_mb, MIN_OPLOG_SIZE_MB), MAX_OPLOG_SIZE_MB)
+    elif _is_auto(oplog_size_mb):
+        oplog_size_mb = None
+
+    # roughly 1MB of memory per connection, budget a quarter of RAM
+    if _is_auto(max_incoming_connections):
+        max_incoming_connections = min(max(int(memory_mb * 0.25), MIN_CONNECTIONS), MAX_CONNECTIONS)
+
+    if _is_auto(journal_commit_interval_ms):
+        journal_commit_interval_ms = settings["commit_interval_ms"]
+
+    return {
+        "workload": workload,
+        "memory_mb": int(memory_mb),
+        "cache_size_gb": float(cache_size_gb),
+        "oplog_size_mb": int(oplog_size_mb) if oplog_size_mb is not None else None,
+        "max_incoming_connections": int(max_incoming_connections),
+        "journal_commit_interval_ms": int(journal_commit_interval_ms)
+    }
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            "mongodb_tuning_profile": mongodb_tuning_profile
+        }
@@ -0,0 +1,70 @@
+"""
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+def run(stackargs):
+    """Create an AMI with MongoDB preinstalled from a build host."""
+    import json
+
+    # Instantiate authoring stack
+    stack = newStack(stackargs)
+
+    # Add default variables
+    stack.parse.add_required(key="hostname")
+    stack.parse.add_required(key="ami_name")
+
+    stack.parse.add_optional(key="aws_default_region", default="us-east-1")
+    stack.parse.add_optional(key="mongodb_version", default="null")
+    stack.parse.add_optional(key="cloud_tags_hash", default="null")
+
+    # Add shelloutconfig dependencies
+    stack.add_shelloutconfig('config0-publish:::mongodb::create_ami')
+
+    # Initialize 
+    stack.init_variables()
+    stack.init_shelloutconfigs()
+
+    _lookup = {
+        "must_exists": True,
+        "must_be_one": True,
+        "resource_type": "server",
+        "hostname": stack.hostname
+    }
+    server = list(stack.get_resource(**_lookup))[0]
+
+    env_vars = {
+        "METHOD": "create",
+        "AMI_NAME": stack.ami_name,
+        "INSTANCE_ID": server["instance_id"],
+        "AWS_DEFAULT_REGION": stack.aws_default_region
+    }
+
+    if stack.get_attr("mongodb_version"):
+        env_vars["MONGODB_VERSION"] = stack.mongodb_version
+
+    if stack.get_attr("cloud_tags_hash"):
+        env_vars["CLOUD_TAGS_HASH"] = stack.cloud_tags_hash
+
+    inputargs = {
+        "display": True,
+        "human_description": f'Create AMI {stack.ami_name} from {stack.hostname}',
+        "env_vars": json.dumps(env_vars),
+        "automation_phase": "infrastructure"
+    }
+
+    stack.create_ami.resource_exec(**inputargs)
+
+    return stack.get_results()
@@ -25,6 +25,11 @@ def run(stackargs):
     # Add default variables
     stack.parse.add_required(key="basename")
 
+    # Certificate key profile (ECDSA keys make TLS handshakes cheaper for mongod)
+    stack.parse.add_optional(key="key_algorithm",
+                             choices=["rsa2048", "rsa3072", "rsa4096", "ecdsa-p256", "ecdsa-p384"],
+                             default="rsa2048")
+
     # Add shelloutconfig dependencies
     stack.add_shelloutconfig('config0-publish:::mongodb::create_keys')
 
@@ -34,7 +39,8 @@ def run(stackargs):
 
     env_vars = {
         "NAME": stack.basename,
-        "METHOD": "create_ssl_combined"
+        "METHOD": "create_ssl_combined",
+        "KEY_ALGORITHM": stack.key_algorithm
     }
 
     inputargs = {
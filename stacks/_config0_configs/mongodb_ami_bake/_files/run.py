@@ -0,0 +1,347 @@
+"""
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+class Main(newSchedStack):
+
+    def __init__(self, stackargs):
+
+        newSchedStack.__init__(self, stackargs)
+
+        # Add default variables
+        self.parse.add_required(key="ami_name",
+                                types="str")
+
+        self.parse.add_optional(key="ami",
+                                types="str",
+                                default="null")
+
+        self.parse.add_optional(key="ami_filter",
+                                types="str",
+                                default='ubuntu/images/hvm-ssd-gp3/ubuntu-noble-24.04-amd64-server-*')
+
+        self.parse.add_optional(key="ami_owner",
+                                default='099720109477')
+
+        self.parse.add_optional(key="aws_default_region",
+                                types="str",
+                                tags="create_vm,bastion,mongo_replica",
+                                default="us-east-1")
+
+        # pinned mongodb-org version e.g. 7.0.14 - null installs the latest of the series
+        self.parse.add_optional(key="mongodb_version",
+                                types="str",
+                                default="null")
+
+        self.parse.add_required(key="bastion_sg_id",
+                                default="null")
+
+        self.parse.add_required(key="bastion_subnet_ids",
+                                default="null")
+
+        self.parse.add_optional(key="bastion_ami",
+                                default="null")
+
+        self.parse.add_optional(key="bastion_ami_filter",
+                                types = "str",
+                                default="ubuntu/images/hvm-ssd/ubuntu-jammy-22.04-amd64-server-*")
+
+        self.parse.add_optional(key="bastion_ami_owner",
+                                default='099720109477')
+
+        self.parse.add_required(key="sg_id",
+                                tags="create_vm",
+                                default="null")
+
+        self.parse.add_required(key="vpc_id",
+                                tags="create_vm,bastion",
+                                default="null")
+
+        self.parse.add_required(key="subnet_ids",
+                                tags="create_vm",
+                                default="null")
+
+        self.parse.add_optional(key="instance_type",
+                                types="str",
+                                tags="create_vm,bastion,mongo_replica",
+                                default="t3.micro")
+
+        self.parse.add_optional(key="disksize",
+                                types="int",
+                                tags="create_vm,bastion",
+                                default="20")
+
+        self.parse.add_optional(key="cloud_tags_hash",
+                                types="str",
+                                tags="create_vm,bastion",
+                                default='null')
+
+        # Add substack
+        self.stack.add_substack('config0-publish:::ec2_ubuntu')
+        self.stack.add_substack('config0-publish:::mongodb_replica_ubuntu')
+        self.stack.add_substack('config0-publish:::create_mongodb_ami')
+        self.stack.add_substack('config0-publish:::delete_resource')
+        self.stack.add_substack('config0-publish:::new_ec2_ssh_key')
+
+        self.stack.init_substacks()
+
+    def _set_bastion_hostname(self):
+        self.stack.set_variable("bastion_hostname",
+                                f"{self.stack.ami_name}-bake-config".replace("_", "-").replace(".", "-"),
+                                tags="mongo_replica")
+
+    def _set_build_hostname(self):
+        self.stack.set_variable("build_hostname",
+                                f"{self.stack.ami_name}-bake-build".replace("_", "-").replace(".", "-"))
+
+    def _set_ssh_key_name(self):
+        self.stack.set_variable("ssh_key_name",
+                                f"{self.stack.ami_name}-bake-ssh-key",
+                                tags="bastion,create_vm,mongo_replica",
+                                types="str")
+
+    def run_sshkey(self):
+        self.stack.init_variables()
+        self._set_ssh_key_name()
+
+        arguments = {
+            "key_name": self.stack.ssh_key_name,
+            "clobber": True,
+            "aws_default_region": self.stack.aws_default_region
+        }
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f'Create and upload ssh key name {self.stack.ssh_key_name}'
+        }
+
+        return self.stack.new_ec2_ssh_key.insert(display=True, **inputargs)
+
+    def run_bastion(self):
+        self.stack.init_variables()
+
+        self._set_bastion_hostname()
+        self._set_ssh_key_name()
+
+        arguments = self.stack.get_tagged_vars(tag="bastion", output="dict")
+
+        arguments["size"] = self.stack.instance_type
+        arguments["hostname"] = self.stack.bastion_hostname
+        arguments["subnet_ids"] = self.stack.bastion_subnet_ids
+        arguments["sg_id"] = self.stack.bastion_sg_id
+        arguments["bootstrap_for_exec"] = True
+        arguments["ip_key"] = "public_ip"
+
+        if self.stack.get_attr("bastion_ami"):
+            arguments["ami"] = self.stack.bastion_ami
+        elif self.stack.get_attr("bastion_ami_filter") and self.stack.get_attr("bastion_ami_owner"):
+            arguments["ami_filter"] = self.stack.bastion_ami_filter
+            arguments["ami_owner"] = self.stack.bastion_ami_owner
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Creating bake bastion hostname {self.stack.bastion_hostname} on ec2"
+        }
+
+        return self.stack.ec2_ubuntu.insert(display=True, **inputargs)
+
+    def run_build(self):
+        self.stack.init_variables()
+
+        self._set_build_hostname()
+        self._set_ssh_key_name()
+
+        # no data volume - the baked image only carries the root disk
+        arguments = self.stack.get_tagged_vars(tag="create_vm", output="dict")
+
+        arguments["size"] = self.stack.instance_type
+        arguments["hostname"] = self.stack.build_hostname
+        arguments["bootstrap_for_exec"] = None
+        arguments["ip_key"] = "private_ip"
+
+        if self.stack.get_attr("ami"):
+            arguments["ami"] = self.stack.ami
+        else:
+            arguments["ami_filter"] = self.stack.ami_filter
+            arguments["ami_owner"] = self.stack.ami_owner
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Creating bake build hostname {self.stack.build_hostname} on ec2"
+        }
+
+        return self.stack.ec2_ubuntu.insert(display=True, **inputargs)
+
+    def run_install(self):
+        self.stack.init_variables()
+
+        self._set_bastion_hostname()
+        self._set_build_hostname()
+        self._set_ssh_key_name()
+
+        # install-only run - python, os tuning and mongodb-org, no replica set
+        arguments = self.stack.get_tagged_vars(tag="mongo_replica", output="dict")
+        arguments["mongodb_hosts"] = [self.stack.build_hostname]
+        arguments["mongodb_cluster"] = self.stack.ami_name
+        arguments["mongodb_bake"] = True
+
+        if self.stack.get_attr("mongodb_version"):
+            arguments["mongodb_package_version"] = self.stack.mongodb_version
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Install MongoDB on bake build hostname {self.stack.build_hostname}"
+        }
+
+        return self.stack.mongodb_replica_ubuntu.insert(display=True, **inputargs)
+
+    def run_ami(self):
+        self.stack.init_variables()
+
+        self._set_build_hostname()
+
+        arguments = {
+            "hostname": self.stack.build_hostname,
+            "ami_name": self.stack.ami_name,
+            "aws_default_region": self.stack.aws_default_region
+        }
+
+        if self.stack.get_attr("mongodb_version"):
+            arguments["mongodb_version"] = self.stack.mongodb_version
+
+        if self.stack.get_attr("cloud_tags_hash"):
+            arguments["cloud_tags_hash"] = self.stack.cloud_tags_hash
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Create AMI {self.stack.ami_name}"
+        }
+
+        return self.stack.create_mongodb_ami.insert(display=True, **inputargs)
+
+    def run_cleanup(self):
+        self.stack.init_variables()
+
+        self._set_bastion_hostname()
+        self._set_build_hostname()
+
+        # the build host and bastion are only needed while baking
+        for hostname in [self.stack.build_hostname, self.stack.bastion_hostname]:
+            arguments = {
+                "resource_type": "server",
+                "must_exists": True,
+                "hostname": hostname
+            }
+
+            inputargs = {
+                "arguments": arguments,
+                "automation_phase": "infrastructure",
+                "human_description": f"Destroying bake hostname {hostname} on ec2"
+            }
+
+            self.stack.delete_resource.insert(display=True, **inputargs)
+
+        return self.stack.get_results()
+
+    def run(self):
+        self.stack.unset_parallel(sched_init=True)
+        self.add_job("sshkey")
+        self.add_job("bastion")
+        self.add_job("build")
+        self.add_job("install")
+        self.add_job("ami")
+        self.add_job("cleanup")
+
+        return self.finalize_jobs()
+
+    def schedule(self):
+        # bastion and build host fan out after the ssh key, the install
+        # waits on both, then the AMI is created and the hosts removed
+        sched = self.new_schedule()
+        sched.job = "sshkey"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.conditions.retries = 1
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create and upload ssh-key"
+        sched.on_success = ["bastion", "build"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "bastion"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create MongoDB AMI Bake Bastion"
+        sched.conditions.dependency = ["sshkey"]
+        sched.on_success = ["install"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "build"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create MongoDB AMI Build VM"
+        sched.conditions.dependency = ["sshkey"]
+        sched.on_success = ["install"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "install"
+        sched.archive.timeout = 3600
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Install MongoDB on Build VM"
+        sched.conditions.dependency = ["sshkey", "bastion", "build"]
+        sched.on_success = ["ami"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "ami"
+        sched.archive.timeout = 3600
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create MongoDB AMI"
+        sched.on_success = ["cleanup"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "cleanup"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Destroy MongoDB AMI Build VM and Bastion"
+        self.add_schedule()
+
+        return self.get_schedules()
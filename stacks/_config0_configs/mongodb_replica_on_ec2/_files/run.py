@@ -42,6 +42,15 @@ class Main(newSchedStack):
         self.parse.add_optional(key="ami_owner",
                                 default='099720109477')
 
+        # AMI baked by mongodb_ami_bake - replicas boot with MongoDB preinstalled
+        self.parse.add_optional(key="mongodb_ami_name",
+                                types="str",
+                                default="null")
+
+        self.parse.add_optional(key="mongodb_preinstalled",
+                                types="bool",
+                                default="null")
+
         self.parse.add_optional(key="aws_default_region",
                                 types="str",
                                 tags="create_vm,bastion,mongo_replica",
@@ -57,6 +66,169 @@ class Main(newSchedStack):
                                 tags="create_vm,mongo_replica",
                                 default="null")
 
+        self.parse.add_optional(key="pem_key_algorithm",
+                                choices=["rsa2048", "rsa3072", "rsa4096", "ecdsa-p256", "ecdsa-p384"],
+                                types="str",
+                                default="rsa2048")
+
+        # wire, collection and journal compression
+        self.parse.add_optional(key="mongodb_network_compression",
+                                types="str",
+                                tags="mongo_replica",
+                                default="snappy,zstd,zlib")
+
+        self.parse.add_optional(key="mongodb_block_compressor",
+                                choices=["snappy", "zstd", "zlib", "none"],
+                                types="str",
+                                tags="mongo_replica",
+                                default="snappy")
+
+        self.parse.add_optional(key="mongodb_journal_compressor",
+                                choices=["snappy", "zstd", "zlib", "none"],
+                                types="str",
+                                tags="mongo_replica",
+                                default="snappy")
+
+        # per-member replica set attributes - b64 json of replica number or
+        # hostname to priority, votes, hidden, secondaryDelaySecs, tags, arbiterOnly
+        self.parse.add_optional(key="mongodb_members_hash",
+                                types="str",
+                                default="null")
+
+        # hidden, tagged member for reporting queries and backups, kept off
+        # the serving secondaries
+        self.parse.add_optional(key="analytics_member",
+                                types="bool",
+                                default="null")
+
+        self.parse.add_optional(key="analytics_instance_type",
+                                types="str",
+                                default="null")
+
+        # AZ of the application - replicas are spread round-robin over
+        # subnet_ids and the members in this AZ are preferred as primary
+        self.parse.add_optional(key="app_local_az",
+                                types="str",
+                                tags="mongo_replica",
+                                default="null")
+
+        # profiler and slow operation logging (mongodb-slowlog on the replicas)
+        self.parse.add_optional(key="mongodb_profiling_mode",
+                                choices=["off", "slowOp", "all"],
+                                types="str",
+                                tags="mongo_replica",
+                                default="off")
+
+        self.parse.add_optional(key="mongodb_slow_op_threshold_ms",
+                                types="int",
+                                tags="mongo_replica",
+                                default="100")
+
+        self.parse.add_optional(key="mongodb_slow_op_sample_rate",
+                                types="str",
+                                tags="mongo_replica",
+                                default="1.0")
+
+        # Prometheus exporter on every replica (roles/metrics_exporter)
+        self.parse.add_optional(key="mongodb_metrics_exporter",
+                                types="bool",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="mongodb_metrics_exporter_address",
+                                types="str",
+                                tags="mongo_replica",
+                                default="127.0.0.1")
+
+        self.parse.add_optional(key="mongodb_metrics_exporter_port",
+                                types="int",
+                                tags="mongo_replica",
+                                default="9216")
+
+        # backups of a secondary (roles/backup) - mongodb_backup takes one in
+        # the backup job, mongodb_backup_schedule installs a timer that dumps
+        # on the selected member
+        self.parse.add_optional(key="mongodb_backup",
+                                choices=["dump", "snapshot"],
+                                types="str",
+                                default="null")
+
+        self.parse.add_optional(key="mongodb_backup_hostname",
+                                types="str",
+                                default="null")
+
+        self.parse.add_optional(key="mongodb_backup_dir",
+                                types="str",
+                                tags="mongo_replica",
+                                default="/var/backups/mongodb")
+
+        self.parse.add_optional(key="mongodb_backup_compressor",
+                                choices=["zstd", "gzip"],
+                                types="str",
+                                tags="mongo_replica",
+                                default="zstd")
+
+        self.parse.add_optional(key="mongodb_backup_parallel_collections",
+                                types="int",
+                                tags="mongo_replica",
+                                default="4")
+
+        self.parse.add_optional(key="mongodb_backup_chunk_size_mb",
+                                types="int",
+                                tags="mongo_replica",
+                                default="1024")
+
+        self.parse.add_optional(key="mongodb_backup_keep",
+                                types="int",
+                                tags="mongo_replica",
+                                default="3")
+
+        self.parse.add_optional(key="mongodb_backup_restore_test",
+                                types="str",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="mongodb_backup_restore_test_dir",
+                                types="str",
+                                tags="mongo_replica",
+                                default="/var/tmp/mongodb-restore-test")
+
+        self.parse.add_optional(key="mongodb_backup_schedule",
+                                types="str",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="ansible_fast_mode",
+                                types="bool",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="rolling_update",
+                                types="bool",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="ansible_single_pass",
+                                types="bool",
+                                tags="mongo_replica",
+                                default="null")
+
+        # scale-out - new replicas get their data volume from a snapshot of
+        # an existing member and only replay the oplog
+        self.parse.add_optional(key="snapshot_seed",
+                                types="bool",
+                                default="null")
+
+        self.parse.add_optional(key="seed_hostname",
+                                types="str",
+                                default="null")
+
+        # seeded replicas replay the oplog written since the snapshot
+        self.parse.add_optional(key="mongodb_seed_join_timeout",
+                                types="int",
+                                tags="mongo_replica",
+                                default="3600")
+
         self.parse.add_required(key="bastion_sg_id",
                                 default="null")
 
@@ -96,9 +268,15 @@ class Main(newSchedStack):
 
         self.parse.add_optional(key="instance_type",
                                 types="str",
-                                tags="create_vm,bastion",
+                                tags="create_vm,bastion,mongo_replica",
                                 default="t3.micro")
 
+        self.parse.add_optional(key="mongodb_workload",
+                                choices=["read_heavy", "write_heavy", "mixed"],
+                                types="str",
+                                tags="mongo_replica",
+                                default="mixed")
+
         self.parse.add_optional(key="disksize",
                                 types="int",
                                 tags="create_vm,bastion",
@@ -119,7 +297,7 @@ class Main(newSchedStack):
         # data disk
         self.parse.add_optional(key="volume_size",
                                 types="int",
-                                tags="create_vm",
+                                tags="create_vm,mongo_replica",
                                 default=100)
 
         self.parse.add_optional(key="volume_mountpoint",
@@ -132,11 +310,38 @@ class Main(newSchedStack):
                                 tags="create_vm,mongo_replica",
                                 default="xfs")
 
+        # data volume layout - volume_count > 1 stripes the volumes
+        self.parse.add_optional(key="volume_type",
+                                types="str",
+                                tags="mongo_replica",
+                                default="gp3")
+
+        self.parse.add_optional(key="volume_iops",
+                                types="int",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="volume_throughput",
+                                types="int",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="volume_count",
+                                types="int",
+                                tags="mongo_replica",
+                                default=1)
+
+        self.parse.add_optional(key="journal_volume_size",
+                                types="int",
+                                tags="mongo_replica",
+                                default="null")
+
         # Add substack
         self.stack.add_substack('config0-publish:::ec2_ubuntu')
         self.stack.add_substack('config0-publish:::create_mongodb_pem')
         self.stack.add_substack('config0-publish:::create_mongodb_keyfile')
         self.stack.add_substack('config0-publish:::mongodb_replica_ubuntu')
+        self.stack.add_substack('config0-publish:::seed_mongodb_volumes')
         self.stack.add_substack('config0-publish:::delete_resource')
         self.stack.add_substack('config0-publish:::new_ec2_ssh_key')
         self.stack.add_substack('config0-publish:::config0_core::output_resource_to_ui')
@@ -181,7 +386,8 @@ class Main(newSchedStack):
 
         inputargs = {
             "arguments": {
-                "basename": self.stack.mongodb_cluster
+                "basename": self.stack.mongodb_cluster,
+                "key_algorithm": self.stack.pem_key_algorithm
             }
         }
 
@@ -230,6 +436,41 @@ class Main(newSchedStack):
 
         return self.stack.ec2_ubuntu.insert(display=True, **inputargs)
 
+    def _get_ami(self):
+        # the one place the replica AMI is resolved, in this order:
+        #   ami                      - explicit image, baked if create_mongodb_ami
+        #                              recorded it with mongodb_preinstalled
+        #   mongodb_ami_name         - image baked by mongodb_ami_bake (ami unset)
+        #   ami_filter and ami_owner - otherwise, else the ec2_ubuntu default
+        # Returns the ec2_ubuntu ami arguments and the baked ami resource, if any.
+        if self.stack.get_attr("ami"):
+            _lookup = {
+                "resource_type": "ami",
+                "ami_id": self.stack.ami
+            }
+
+            baked_ami = next((_ami for _ami in (self.stack.get_resource(**_lookup) or [])
+                              if _ami.get("mongodb_preinstalled")), None)
+
+            return {"ami": self.stack.ami}, baked_ami
+
+        if self.stack.get_attr("mongodb_ami_name"):
+            _lookup = {
+                "must_exists": True,
+                "must_be_one": True,
+                "resource_type": "ami",
+                "name": self.stack.mongodb_ami_name
+            }
+
+            _ami = list(self.stack.get_resource(**_lookup))[0]
+
+            return {"ami": _ami["ami_id"]}, _ami if _ami.get("mongodb_preinstalled") else None
+
+        if self.stack.get_attr("ami_filter") and self.stack.get_attr("ami_owner"):
+            return {"ami_filter": self.stack.ami_filter, "ami_owner": self.stack.ami_owner}, None
+
+        return {}, None
+
     def _get_create_arguments(self):
         arguments = self.stack.get_tagged_vars(tag="create_vm", output="dict")
 
@@ -237,39 +478,149 @@ class Main(newSchedStack):
         arguments["bootstrap_for_exec"] = None
         arguments["ip_key"] = "private_ip"
 
-        if self.stack.get_attr("ami"):
-            arguments["ami"] = self.stack.ami
-        elif self.stack.get_attr("ami_filter") and self.stack.get_attr("ami_owner"):
-            arguments["ami_filter"] = self.stack.ami_filter
-            arguments["ami_owner"] = self.stack.ami_owner
+        ami_arguments, _ = self._get_ami()
+        arguments.update(ami_arguments)
 
         return arguments
 
+    def _get_subnet_ids(self):
+        if isinstance(self.stack.subnet_ids, list):
+            return self.stack.subnet_ids
+
+        return [subnet_id.strip() for subnet_id in str(self.stack.subnet_ids).split(",") if subnet_id.strip()]
+
+    def _get_subnet_id(self, hostname, subnet_ids):
+        # replica N always lands in subnet N % len(subnet_ids) and the
+        # analytics member in the last subnet - changing num_of_replicas
+        # never moves a host to another AZ
+        if hostname == self._get_analytics_hostname():
+            return subnet_ids[-1]
+
+        return subnet_ids[int(hostname.rsplit("-num-", 1)[1]) % len(subnet_ids)]
+
+    def _get_analytics_hostname(self):
+        return f"{self.stack.hostname_base}-analytics".replace("_", "-")
+
+    def _get_mongodb_hosts(self):
+        mongodb_hosts = [f"{self.stack.hostname_base}-num-{num}".replace("_", "-")
+                         for num in range(int(self.stack.num_of_replicas))]
+
+        # last, so it never initiates the set
+        if self.stack.get_attr("analytics_member"):
+            mongodb_hosts.append(self._get_analytics_hostname())
+
+        return mongodb_hosts
+
+    def _get_member_attrs(self):
+        # keyed by hostname for mongodb_replica_ubuntu - replica numbers are
+        # resolved to their hostnames
+        import json
+
+        mongodb_hosts = self._get_mongodb_hosts()
+        member_attrs = {}
+
+        if self.stack.get_attr("analytics_member"):
+            member_attrs[self._get_analytics_hostname()] = {
+                "hidden": True,
+                "priority": 0,
+                "tags": {"workload": "analytics"}
+            }
+
+        if self.stack.get_attr("mongodb_members_hash"):
+            for key, attrs in json.loads(self.stack.b64_decode(self.stack.mongodb_members_hash)).items():
+                hostname = mongodb_hosts[int(key)] if str(key).isdigit() else key
+                member_attrs.setdefault(hostname, {}).update(attrs)
+
+        return member_attrs
+
+    def _get_seeds(self):
+        # ebs_snapshot_seed resources written by the seed_mongodb_volumes shellout
+        _lookup = {
+            "resource_type": "ebs_snapshot_seed",
+            "name": f"{self.stack.mongodb_cluster}-snapshot-seed"
+        }
+
+        return self.stack.get_resource(**_lookup) or []
+
+    def _check_seed_layout(self):
+        # the seed snapshot is one crash consistent snapshot of <volume_name> -
+        # striped volumes and a split journal volume are not in it. Checked
+        # before any instance, snapshot or seeded volume is created.
+        if int(self.stack.volume_count) > 1 or self.stack.get_attr("journal_volume_size"):
+            raise Exception("snapshot_seed is not supported with volume_count > 1 or journal_volume_size")
+
+    def _get_seed_candidates(self):
+        # members a seed snapshot may be taken from - never hidden, delayed,
+        # arbiter or analytics members. Later replicas first: replica 0 is
+        # the preferred primary and only a last resort.
+        if self.stack.get_attr("seed_hostname"):
+            return [self.stack.seed_hostname]
+
+        member_attrs = self._get_member_attrs()
+
+        candidates = [hostname for hostname in self._get_mongodb_hosts()
+                      if hostname != self._get_analytics_hostname()
+                      and not member_attrs.get(hostname, {}).get("hidden")
+                      and not member_attrs.get(hostname, {}).get("arbiterOnly")
+                      and not int(member_attrs.get(hostname, {}).get("secondaryDelaySecs", 0))]
+
+        return candidates[1:][::-1] + candidates[:1]
+
+    def _get_seeded_hosts(self, mongodb_hosts):
+        # replicas seeded before keep their snapshot volume; with snapshot_seed
+        # the replicas added to an existing cluster are seeded too
+        seeded = set()
+
+        for _seed in self._get_seeds():
+            seeded.update(_seed.get("seeded_hosts") or [])
+
+        if self.stack.get_attr("snapshot_seed"):
+            existing = [hostname for hostname in mongodb_hosts
+                        if self.stack.get_resource(resource_type="server", hostname=hostname)]
+
+            if existing:
+                seeded.update(hostname for hostname in mongodb_hosts if hostname not in existing)
+
+        return seeded
+
     def run_create(self):
         self.stack.init_variables()
 
+        if self.stack.get_attr("snapshot_seed"):
+            self._check_seed_layout()
+
         self._set_hostname_base()
-        self._set_bastion_hostname()
         self._set_ssh_key_name()
 
         # create vms in parallel
         self.stack.set_parallel()
 
-        mongodb_hosts = []
+        mongodb_hosts = self._get_mongodb_hosts()
+        seeded_hosts = self._get_seeded_hosts(mongodb_hosts)
+        subnet_ids = self._get_subnet_ids()
 
         # Create mongodb ec2 instances
-        for num in range(int(self.stack.num_of_replicas)):
-            hostname = f"{self.stack.hostname_base}-num-{num}".replace("_", "-")
+        for hostname in mongodb_hosts:
             human_description = f"Creating hostname {hostname} on ec2"
             volume_name = f"{hostname}-{self.stack.volume_mountpoint}".replace("/", "-").replace(".", "-")
 
-            mongodb_hosts.append(hostname)
-
             arguments = self._get_create_arguments()
             arguments["hostname"] = hostname
             arguments["volume_name"] = volume_name  # ref 45304958324
-            arguments["ami_filter"] = self.stack.ami_filter
-            arguments["ami_owner"] = self.stack.ami_owner
+
+            # one subnet (AZ) per replica, round-robin by replica number
+            arguments["subnet_ids"] = self._get_subnet_id(hostname, subnet_ids)
+
+            if hostname == self._get_analytics_hostname() and self.stack.get_attr("analytics_instance_type"):
+                arguments["size"] = self.stack.analytics_instance_type
+                human_description = f"Creating analytics hostname {hostname} on ec2"
+
+            # seeded replicas skip the fresh volume - run_seed creates it
+            # from the snapshot under the same volume_name
+            if hostname in seeded_hosts:
+                arguments.pop("volume_name", None)
+                arguments.pop("volume_size", None)
+                human_description = f"Creating hostname {hostname} on ec2 (snapshot seeded volume)"
 
             inputargs = {
                 "arguments": arguments,
@@ -279,17 +630,108 @@ class Main(newSchedStack):
 
             self.stack.ec2_ubuntu.insert(display=True, **inputargs)
 
-        # configure in sequence
         self.stack.unset_parallel(wait_all=True)
 
+        return self.stack.get_results()
+
+    def run_seed(self):
+        self.stack.init_variables()
+
+        if not self.stack.get_attr("snapshot_seed"):
+            return self.stack.get_results()
+
+        self._check_seed_layout()
+
+        # the seed source is checked with the admin credentials of the cluster
+        if not self.stack.get_attr("mongodb_username") or not self.stack.get_attr("mongodb_password"):
+            raise Exception("snapshot_seed needs the mongodb_username and mongodb_password of the cluster")
+
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+        self._set_ssh_key_name()
+
+        seed_candidates = self._get_seed_candidates()
+
+        if not seed_candidates:
+            raise Exception("snapshot_seed needs a replica that is not hidden, delayed or an arbiter - or set seed_hostname")
+
+        # the first live member among the candidates must be a current,
+        # visible secondary before its volume is snapshotted
+        arguments = self.stack.get_tagged_vars(tag="mongo_replica", output="dict")
+        arguments["mongodb_hosts"] = self._get_mongodb_hosts()
+        arguments["mongodb_seed_candidates"] = ",".join(seed_candidates)
+
+        # install-only settings
+        for key in ["rolling_update", "ansible_single_pass"]:
+            arguments.pop(key, None)
+
+        member_attrs = self._get_member_attrs()
+
+        if member_attrs:
+            arguments["mongodb_members_hash"] = self.stack.b64_encode(member_attrs)
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Check the snapshot seed source of {self.stack.mongodb_cluster}"
+        }
+
+        self.stack.mongodb_replica_ubuntu.insert(display=True, **inputargs)
+
+        arguments = {
+            "mongodb_cluster": self.stack.mongodb_cluster,
+            "mongodb_hosts": self._get_mongodb_hosts(),
+            "seed_candidates": ",".join(seed_candidates),
+            "volume_mountpoint": self.stack.volume_mountpoint,
+            "volume_type": self.stack.volume_type,
+            "volume_size": self.stack.volume_size,
+            "aws_default_region": self.stack.aws_default_region
+        }
+
+        for key in ["volume_iops", "volume_throughput", "cloud_tags_hash"]:
+            if self.stack.get_attr(key):
+                arguments[key] = self.stack.get_attr(key)
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Seed new replica volumes for {self.stack.mongodb_cluster} from a snapshot"
+        }
+
+        self.stack.seed_mongodb_volumes.insert(display=True, **inputargs)
+
+        return self.stack.get_results()
+
+    def run_install(self):
+        self.stack.init_variables()
+
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+        self._set_ssh_key_name()
+
         # provide the mongodb_hosts and begin installing
         # the mongo specific package and replication
         arguments = self.stack.get_tagged_vars(tag="mongo_replica", output="dict")
-        arguments["mongodb_hosts"] = mongodb_hosts
+        arguments["mongodb_hosts"] = self._get_mongodb_hosts()
+
+        member_attrs = self._get_member_attrs()
+
+        if member_attrs:
+            arguments["mongodb_members_hash"] = self.stack.b64_encode(member_attrs)
 
         if self.stack.get_attr("publish_to_saas"):
             arguments["publish_to_saas"] = True
 
+        # baked AMIs skip the python and mongodb-org install phases
+        if self.stack.get_attr("mongodb_preinstalled") or self._get_ami()[1]:
+            arguments["mongodb_preinstalled"] = True
+
+        # the latest seed - its replicas are the ones still joining
+        seeds = self._get_seeds() if self.stack.get_attr("snapshot_seed") else []
+
+        if seeds:
+            arguments["mongodb_seed_timestamp"] = max(_seed["seed_timestamp"] for _seed in seeds)
+
         human_description = "Initialing Ubuntu specific actions mongodb_username and mongodb_password"
 
         inputargs = {
@@ -300,12 +742,90 @@ class Main(newSchedStack):
 
         return self.stack.mongodb_replica_ubuntu.insert(display=True, **inputargs)
 
+    def run_backup(self):
+        self.stack.init_variables()
+
+        if not self.stack.get_attr("mongodb_backup"):
+            return self.stack.get_results()
+
+        # the backup user is created with the admin credentials of the cluster
+        if not self.stack.get_attr("mongodb_username") or not self.stack.get_attr("mongodb_password"):
+            raise Exception("mongodb_backup needs the mongodb_username and mongodb_password of the cluster")
+
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+        self._set_ssh_key_name()
+
+        arguments = self.stack.get_tagged_vars(tag="mongo_replica", output="dict")
+        arguments["mongodb_hosts"] = self._get_mongodb_hosts()
+        arguments["mongodb_backup"] = self.stack.mongodb_backup
+
+        # install-only settings
+        for key in ["rolling_update", "ansible_single_pass"]:
+            arguments.pop(key, None)
+
+        # the analytics member is tagged workload: analytics and picked
+        # first unless mongodb_backup_hostname names another
+        if self.stack.get_attr("mongodb_backup_hostname"):
+            arguments["mongodb_backup_hostname"] = self.stack.mongodb_backup_hostname
+
+        member_attrs = self._get_member_attrs()
+
+        if member_attrs:
+            arguments["mongodb_members_hash"] = self.stack.b64_encode(member_attrs)
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Back up MongoDB {self.stack.mongodb_cluster} ({self.stack.mongodb_backup}) from a secondary"
+        }
+
+        return self.stack.mongodb_replica_ubuntu.insert(display=True, **inputargs)
+
+    def _publish_timing(self):
+        # critical-path report written by the provision_timing shellout
+        # after the Ansible playbooks of the install job - backups, rolling
+        # updates and seed checks record their own runs
+        _lookup = {
+            "resource_type": "provision_timing",
+            "name": f"{self.stack.mongodb_cluster}-provision-timing-install"
+        }
+
+        if not self.stack.get_resource(**_lookup):
+            return
+
+        keys_to_publish = [
+            "total_seconds",
+            "critical_path_seconds",
+            "overhead_seconds",
+            "wait_seconds",
+            "critical_path_summary",
+            "slowest_tasks_summary"
+        ]
+
+        arguments = {
+            "resource_type": "provision_timing",
+            "name": _lookup["name"],
+            "prefix_key": "timing",
+            "publish_keys_hash": self.stack.b64_encode(keys_to_publish)
+        }
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f'Publish provisioning timing for {self.stack.mongodb_cluster}'
+        }
+
+        self.stack.output_resource_to_ui.insert(display=True, **inputargs)
+
     def run_cleanup(self):
         self.stack.init_variables()
 
         self._set_hostname_base()
         self._set_bastion_hostname()
 
+        self._publish_timing()
+
         arguments = {"resource_type": "server"}
 
         if self.stack.get_attr("bastion_destroy"):
@@ -355,11 +875,18 @@ class Main(newSchedStack):
         self.add_job("keyfile")
         self.add_job("bastion")
         self.add_job("create")
+        self.add_job("seed")
+        self.add_job("install")
+        self.add_job("backup")
         self.add_job("cleanup")
 
         return self.finalize_jobs()
 
     def schedule(self):
+        # sshkey, pem and keyfile are root jobs and start together; the
+        # bastion and the replica vms need the ssh key and fan out from it.
+        # seed follows create, install waits on all of them (critical path),
+        # then backup and cleanup.
         sched = self.new_schedule()
         sched.job = "sshkey"
         sched.archive.timeout = 1800
@@ -369,7 +896,7 @@ class Main(newSchedStack):
         sched.conditions.retries = 1
         sched.automation_phase = "infrastructure"
         sched.human_description = "Create and upload ssh-key"
-        sched.on_success = ["pem"]
+        sched.on_success = ["bastion", "create"]
         self.add_schedule()
 
         sched = self.new_schedule()
@@ -380,7 +907,7 @@ class Main(newSchedStack):
         sched.failure.keep_resources = True
         sched.automation_phase = "infrastructure"
         sched.human_description = "Create and upload MongoDB PEM"
-        sched.on_success = ["keyfile"]
+        sched.on_success = ["install"]
         self.add_schedule()
 
         sched = self.new_schedule()
@@ -390,8 +917,8 @@ class Main(newSchedStack):
         sched.archive.cleanup.instance = "clear"
         sched.failure.keep_resources = True
         sched.automation_phase = "infrastructure"
-        sched.on_success = ["bastion"]
         sched.human_description = "Create and upload MongoDB keyfile"
+        sched.on_success = ["install"]
         self.add_schedule()
 
         sched = self.new_schedule()
@@ -402,7 +929,8 @@ class Main(newSchedStack):
         sched.failure.keep_resources = True
         sched.automation_phase = "infrastructure"
         sched.human_description = "Create MongoDB Bastion Config"
-        sched.on_success = ["create"]
+        sched.conditions.dependency = ["sshkey"]
+        sched.on_success = ["install"]
         self.add_schedule()
 
         sched = self.new_schedule()
@@ -412,8 +940,44 @@ class Main(newSchedStack):
         sched.archive.cleanup.instance = "clear"
         sched.failure.keep_resources = True
         sched.automation_phase = "infrastructure"
-        sched.human_description = "Create MongoDB Replica"
-        sched.conditions.dependency = ["sshkey", "keyfile", "pem"]
+        sched.human_description = "Create MongoDB Replica VMs"
+        sched.conditions.dependency = ["sshkey"]
+        sched.on_success = ["seed"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "seed"
+        sched.archive.timeout = 14400
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Seed new MongoDB replica volumes from a snapshot"
+        sched.conditions.dependency = ["sshkey", "pem", "keyfile", "bastion", "create"]
+        sched.on_success = ["install"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "install"
+        sched.archive.timeout = 3600
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Install MongoDB Replica"
+        sched.conditions.dependency = ["sshkey", "pem", "keyfile", "bastion", "create", "seed"]
+        sched.on_success = ["backup"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "backup"
+        sched.archive.timeout = 14400
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Back up MongoDB from a secondary"
+        sched.conditions.dependency = ["install"]
         sched.on_success = ["cleanup"]
         self.add_schedule()
 
@@ -15,7 +15,19 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-def _get_ssh_key(stack):
+# replica set limit on voting (and electable) members
+MAX_VOTING_MEMBERS = 7
+
+def _get_resource(stack, resource_cache, **lookup):
+    # per-run memoized resource lookup shared by the helpers below
+    _key = tuple(sorted((k, str(v)) for k, v in lookup.items()))
+
+    if _key not in resource_cache:
+        resource_cache[_key] = stack.get_resource(**lookup)
+
+    return resource_cache[_key]
+
+def _get_ssh_key(stack, resource_cache):
     _lookup = {
         "must_exists": True,
         "resource_type": "ssh_key_pair",
@@ -23,9 +35,9 @@ def _get_ssh_key(stack):
         "serialize": True,
         "serialize_fields": ["private_key"]
     }
-    return stack.get_resource(decrypt=True, **_lookup)["private_key"]
+    return _get_resource(stack, resource_cache, decrypt=True, **_lookup)["private_key"]
 
-def _get_mongodb_pem(stack):
+def _get_mongodb_pem(stack, resource_cache):
     _lookup = {
         "must_exists": True,
         "resource_type": "ssl_pem_combined",
@@ -34,10 +46,10 @@ def _get_mongodb_pem(stack):
         "serialize": True,
         "serialize_fields": ["contents"]
     }
-    return stack.get_resource(decrypt=True, **_lookup)["contents"]
+    return _get_resource(stack, resource_cache, decrypt=True, **_lookup)["contents"]
 
 # lookup mongodb keyfile needed for secure mongodb replication
-def _get_mongodb_keyfile(stack):
+def _get_mongodb_keyfile(stack, resource_cache):
     _lookup = {
         "must_exists": True,
         "provider": "openssl",
@@ -46,24 +58,50 @@ def _get_mongodb_keyfile(stack):
         "serialize": True,
         "serialize_fields": ["contents"]
     }
-    return stack.get_resource(decrypt=True, **_lookup)["contents"]
-
-def _get_mongodb_hosts(stack):
-    public_ips = []
-    private_ips = []
-    mongodb_hosts_info = []
+    return _get_resource(stack, resource_cache, decrypt=True, **_lookup)["contents"]
 
+def _get_servers(stack, resource_cache, mongodb_hosts):
+    # single bulk lookup of the servers of this cluster, indexed by
+    # hostname - every host of a cluster is created with its ssh key, so
+    # same-named hosts of other clusters are never matched. Memoized, so
+    # the mongos config and shard members reuse the same query.
     _lookup = {
         "must_exists": True,
-        "must_be_one": True,
-        "resource_type": "server"
+        "resource_type": "server",
+        "key_name": stack.ssh_key_name
     }
 
+    hostnames = set(mongodb_hosts)
+    servers = {}
+
+    for _server in _get_resource(stack, resource_cache, **_lookup):
+        if _server.get("hostname") not in hostnames:
+            continue
+
+        if _server["hostname"] in servers:
+            raise Exception(f'expected one server resource for hostname {_server["hostname"]}, found more')
+
+        servers[_server["hostname"]] = _server
+
+    missing = [mongodb_host for mongodb_host in mongodb_hosts if mongodb_host not in servers]
+
+    if missing:
+        raise Exception(f'no server resource for {", ".join(missing)} with ssh key {stack.ssh_key_name}')
+
+    return servers
+
+def _get_mongodb_hosts(stack, resource_cache, members):
+    mongodb_hosts_info = []
+
+    # ordered sets - insertion order keeps the first host as main
+    public_ips = {}
+    private_ips = {}
+
     mongodb_hosts = stack.to_list(stack.mongodb_hosts)
+    servers = _get_servers(stack, resource_cache, mongodb_hosts)
 
     for mongodb_host in mongodb_hosts:
-        _lookup["hostname"] = mongodb_host
-        _host_info = list(stack.get_resource(**_lookup))[0]
+        _host_info = servers[mongodb_host]
 
         # insert volume_name 
         # ref 45304958324
@@ -75,13 +113,350 @@ def _get_mongodb_hosts(stack):
 
         stack.logger.debug_highlight(f'mongo hostname {mongodb_host}, found public_ip "{_host_info["public_ip"]}"')
 
-        if _host_info["public_ip"] not in public_ips: 
-            public_ips.append(_host_info["public_ip"])
+    # the init host (main) is the first electable member in the app-local AZ
+    if stack.get_attr("app_local_az") and not stack.get_attr("mongodb_mongos"):
+        app_local = [_host_info for _host_info in mongodb_hosts_info
+                     if _host_info.get("availability_zone") == stack.app_local_az
+                     and _is_electable(members.get(_host_info["hostname"], {}))]
+
+        if not app_local:
+            raise Exception(f"no electable replica in app_local_az {stack.app_local_az} - "
+                            f"add a subnet in that AZ to subnet_ids")
+
+        mongodb_hosts_info.remove(app_local[0])
+        mongodb_hosts_info.insert(0, app_local[0])
+
+    for _host_info in mongodb_hosts_info:
+        public_ips[_host_info["public_ip"]] = None
+        private_ips[_host_info["private_ip"]] = None
+
+    return mongodb_hosts_info, list(public_ips), list(private_ips)
+
+def _get_volume_layout(stack):
+    # striped data volumes, provisioned performance and a journal/log volume
+    # need the ebs_data_volumes shellout and the data_volume role
+    volume_count = int(stack.volume_count)
+
+    if volume_count < 1:
+        raise Exception(f"volume_count {volume_count} must be at least 1")
+
+    if stack.volume_type not in ["gp3", "io1", "io2"]:
+        raise Exception(f"volume_type {stack.volume_type} not supported - choose from gp3, io1, io2")
+
+    custom = volume_count > 1 or stack.volume_type != "gp3" or stack.get_attr("volume_iops") \
+        or stack.get_attr("volume_throughput") or stack.get_attr("journal_volume_size")
+
+    if not custom:
+        return None
+
+    if not str(stack.volume_size).isdigit():
+        raise Exception("volume_size in GB is required for custom volume layouts")
+
+    if stack.get_attr("journal_volume_size") and str(stack.journal_volume_size) == str(stack.volume_size):
+        raise Exception("journal_volume_size must differ from volume_size - the journal volume is identified by its size")
+
+    return {
+        "volume_count": volume_count,
+        "volume_size": int(stack.volume_size),
+        "split_journal": bool(stack.get_attr("journal_volume_size")),
+        # multi volume layouts and split journals are formatted by the data_volume role
+        "own_format": volume_count > 1 or bool(stack.get_attr("journal_volume_size"))
+    }
+
+def _get_members(stack):
+    # mongodb_members_hash - per-member replica set attributes by hostname
+    if not stack.get_attr("mongodb_members_hash"):
+        return {}
+
+    import json
+
+    return json.loads(stack.b64_decode(stack.mongodb_members_hash))
+
+def _is_electable(attrs):
+    return not (attrs.get("hidden") or attrs.get("arbiterOnly") or int(attrs.get("secondaryDelaySecs", 0)) > 0
+                or attrs.get("priority") == 0 or attrs.get("votes") == 0)
+
+def _get_member_attrs(stack, mongodb_hosts_info, members):
+    # per-member replica set attributes keyed by private ip for the
+    # host_vars written by create_ansible_replica_hosts - every member is
+    # tagged with its AZ, app-local members are preferred as primary
+    private_ips = dict((_host_info["hostname"], _host_info["private_ip"]) for _host_info in mongodb_hosts_info)
+    member_attrs = {}
+
+    for hostname in members:
+        if hostname not in private_ips:
+            raise Exception(f"member attributes for {hostname} - not one of the mongodb_hosts")
+
+    for index, _host_info in enumerate(mongodb_hosts_info):
+        hostname = _host_info["hostname"]
+        attrs = dict(members.get(hostname, {}))
+
+        unsupported = set(attrs) - set(["priority", "votes", "hidden", "secondaryDelaySecs", "tags", "arbiterOnly"])
+
+        if unsupported:
+            raise Exception(f"member attributes {sorted(unsupported)} for {hostname} not supported - "
+                            f"choose from priority, votes, hidden, secondaryDelaySecs, tags, arbiterOnly")
+
+        never_primary = attrs.get("hidden") or attrs.get("arbiterOnly") or int(attrs.get("secondaryDelaySecs", 0)) > 0
+
+        # the first host initiates the set and is preferred as primary
+        if index == 0 and not _is_electable(attrs):
+            raise Exception(f"{hostname} initiates the replica set and must be an electable, voting member")
+
+        if never_primary and attrs.get("priority", 0) != 0:
+            raise Exception(f"{hostname} is hidden, delayed or an arbiter and must have priority 0")
+
+        if attrs.get("votes", 1) not in [0, 1]:
+            raise Exception(f"{hostname} votes must be 0 or 1")
+
+        if attrs.get("votes") == 0 and attrs.get("priority", 0) != 0:
+            raise Exception(f"{hostname} is non-voting and must have priority 0")
+
+        if attrs.get("arbiterOnly") and attrs.get("votes") == 0:
+            raise Exception(f"{hostname} is an arbiter and must vote")
+
+        if attrs.get("arbiterOnly") and stack.get_attr("mongodb_cluster_role") == "configsvr":
+            raise Exception(f"{hostname} - config server replica sets cannot have arbiters")
+
+        if _host_info.get("availability_zone") and not attrs.get("arbiterOnly"):
+            attrs["tags"] = dict({"az": _host_info["availability_zone"]}, **attrs.get("tags", {}))
+
+        # cross-AZ round trips on every majority write - electable members
+        # in the application's AZ win elections (members past the voting
+        # limit keep priority 0)
+        if stack.get_attr("app_local_az") and index < MAX_VOTING_MEMBERS and "priority" not in attrs \
+                and _is_electable(attrs):
+            attrs["priority"] = 2 if _host_info.get("availability_zone") == stack.app_local_az else 1
+
+        if attrs:
+            member_attrs[_host_info["private_ip"]] = attrs
+
+    return member_attrs
+
+def _get_sharding(stack, resource_cache):
+    # replSetName and clusterRole of a config server or shard replica set -
+    # mongos routers also get the config servers, shards, shard keys and
+    # the balancer window
+    import re
+    import json
+
+    sharding = {
+        "mongodb_repl_set_name": stack.mongodb_repl_set_name,
+        "mongodb_cluster_role": "",
+        "mongodb_config_db": "",
+        "mongodb_shards": "[]",
+        "mongodb_shard_collections": "[]",
+        "mongodb_balancer_window_start": "",
+        "mongodb_balancer_window_stop": ""
+    }
+
+    if stack.get_attr("mongodb_cluster_role"):
+        if stack.mongodb_cluster_role not in ["configsvr", "shardsvr"]:
+            raise Exception(f"mongodb_cluster_role {stack.mongodb_cluster_role} not supported - choose from configsvr, shardsvr")
+
+        if stack.get_attr("mongodb_mongos"):
+            raise Exception("mongos routers do not take a mongodb_cluster_role")
+
+        sharding["mongodb_cluster_role"] = stack.mongodb_cluster_role
+
+    if not stack.get_attr("mongodb_mongos"):
+        return sharding
+
+    if not stack.get_attr("mongodb_config_hosts") or not stack.get_attr("mongodb_shards_hash"):
+        raise Exception("mongos routers need mongodb_config_hosts and mongodb_shards_hash")
+
+    def _members(hostnames):
+        servers = _get_servers(stack, resource_cache, hostnames)
+        return [f'{servers[hostname]["private_ip"]}:{stack.mongodb_port}' for hostname in hostnames]
+
+    config_members = _members(stack.to_list(stack.mongodb_config_hosts))
+    sharding["mongodb_config_db"] = f'{stack.mongodb_config_repl_set_name}/{",".join(config_members)}'
+
+    # shard replSetName to its hostnames
+    shards = json.loads(stack.b64_decode(stack.mongodb_shards_hash))
+    sharding["mongodb_shards"] = json.dumps([{"name": name, "hosts": _members(hostnames)}
+                                             for name, hostnames in sorted(shards.items())])
+
+    # namespace to {"key": {...}, "unique": bool}
+    collections = json.loads(stack.b64_decode(stack.mongodb_shard_collections_hash)) \
+        if stack.get_attr("mongodb_shard_collections_hash") else {}
+
+    for namespace, spec in collections.items():
+        key = spec.get("key") or {}
+
+        if not re.match(r"^[^.$]+\.[^$]+$", namespace):
+            raise Exception(f"shard collection {namespace} must be a <database>.<collection> namespace")
+
+        if not key or any(value not in [1, "hashed"] for value in key.values()) \
+                or list(key.values()).count("hashed") > 1:
+            raise Exception(f'shard key of {namespace} - fields must be 1 (ranged) or "hashed" (at most one field)')
+
+    sharding["mongodb_shard_collections"] = json.dumps([{"namespace": namespace,
+                                                         "key": spec["key"],
+                                                         "unique": bool(spec.get("unique"))}
+                                                        for namespace, spec in sorted(collections.items())])
+
+    # "HH:MM-HH:MM" in the config servers' time zone
+    if stack.get_attr("mongodb_balancer_window"):
+        window = re.match(r"^([01]\d|2[0-3]):([0-5]\d)-([01]\d|2[0-3]):([0-5]\d)$", stack.mongodb_balancer_window)
+
+        if not window:
+            raise Exception(f"mongodb_balancer_window {stack.mongodb_balancer_window} must be HH:MM-HH:MM")
+
+        sharding["mongodb_balancer_window_start"] = f"{window.group(1)}:{window.group(2)}"
+        sharding["mongodb_balancer_window_stop"] = f"{window.group(3)}:{window.group(4)}"
+
+    return sharding
+
+def _get_backup(stack):
+    # roles/backup settings - mongodb_backup takes a backup now (dump or
+    # snapshot), mongodb_backup_schedule installs the timer with the install
+    import posixpath
+
+    backup = {
+        "mongodb_backup_enabled": str(bool(stack.get_attr("mongodb_backup") or stack.get_attr("mongodb_backup_schedule"))).lower(),
+        "mongodb_backup_dir": stack.mongodb_backup_dir,
+        "mongodb_backup_compressor": stack.mongodb_backup_compressor,
+        "mongodb_backup_parallel_collections": int(stack.mongodb_backup_parallel_collections),
+        "mongodb_backup_chunk_size_mb": int(stack.mongodb_backup_chunk_size_mb),
+        "mongodb_backup_keep": int(stack.mongodb_backup_keep),
+        "mongodb_backup_restore_test": str(str(stack.mongodb_backup_restore_test).lower() in ["true", "1", "yes"]).lower(),
+        "mongodb_backup_restore_test_dir": stack.mongodb_backup_restore_test_dir,
+        "mongodb_backup_member": "",
+        "mongodb_backup_schedule": stack.mongodb_backup_schedule if stack.get_attr("mongodb_backup_schedule") else ""
+    }
+
+    if backup["mongodb_backup_enabled"] == "false":
+        return backup
+
+    if stack.get_attr("mongodb_backup") and stack.mongodb_backup not in ["dump", "snapshot"]:
+        raise Exception(f"mongodb_backup {stack.mongodb_backup} not supported - choose from dump, snapshot")
 
-        if _host_info["private_ip"] not in private_ips: 
-            private_ips.append(_host_info["private_ip"])
+    if stack.get_attr("mongodb_mongos") or stack.get_attr("mongodb_bake"):
+        raise Exception("mongos routers and image bakes hold no data to back up")
 
-    return mongodb_hosts_info, public_ips, private_ips
+    if stack.get_attr("mongodb_backup") and stack.get_attr("rolling_update"):
+        raise Exception("mongodb_backup and rolling_update are separate runs")
+
+    if backup["mongodb_backup_compressor"] not in ["zstd", "gzip"]:
+        raise Exception(f"mongodb_backup_compressor {backup['mongodb_backup_compressor']} not supported - choose from zstd, gzip")
+
+    for key in ["mongodb_backup_parallel_collections", "mongodb_backup_chunk_size_mb", "mongodb_backup_keep"]:
+        if backup[key] < 1:
+            raise Exception(f"{key} {backup[key]} must be at least 1")
+
+    # dumps and the restore test's scratch mongod under dbPath land in the
+    # data volume snapshots and fill the disk mongod writes to
+    for key in ["mongodb_backup_dir", "mongodb_backup_restore_test_dir"]:
+        backup_dir = posixpath.normpath(backup[key])
+
+        for data_dir in [stack.mongodb_data_dir, stack.volume_mountpoint]:
+            data_dir = posixpath.normpath(data_dir)
+            if backup_dir == data_dir or backup_dir.startswith(data_dir.rstrip("/") + "/"):
+                raise Exception(f"{key} {backup[key]} must be outside {data_dir}")
+
+    return backup
+
+def _get_backup_member(stack, mongodb_hosts_info, member_attrs):
+    # the member a backup disturbs least - the analytics member, then a
+    # hidden one, then the lowest priority secondary, later hosts first.
+    # The init host is the preferred primary and never picked.
+    def _attrs(_host_info):
+        return member_attrs.get(_host_info["private_ip"], {})
+
+    if stack.get_attr("mongodb_backup_hostname"):
+        _host_info = next((_host_info for _host_info in mongodb_hosts_info
+                           if _host_info["hostname"] == stack.mongodb_backup_hostname), None)
+
+        if not _host_info:
+            raise Exception(f"mongodb_backup_hostname {stack.mongodb_backup_hostname} - not one of the mongodb_hosts")
+
+        if _attrs(_host_info).get("arbiterOnly"):
+            raise Exception(f"mongodb_backup_hostname {stack.mongodb_backup_hostname} is an arbiter and holds no data")
+
+        return _host_info
+
+    # arbiters hold no data, delayed members hold stale data
+    candidates = [(index, _host_info) for index, _host_info in enumerate(mongodb_hosts_info)
+                  if index > 0 and not _attrs(_host_info).get("arbiterOnly")
+                  and not int(_attrs(_host_info).get("secondaryDelaySecs", 0))]
+
+    if not candidates:
+        raise Exception("backups need a data bearing secondary - add a replica or set mongodb_backup_hostname")
+
+    def _rank(candidate):
+        index, _host_info = candidate
+        attrs = _attrs(_host_info)
+        return (attrs.get("tags", {}).get("workload") != "analytics", not attrs.get("hidden"),
+                attrs.get("priority", 1), -index)
+
+    return sorted(candidates, key=_rank)[0][1]
+
+def _get_seed_candidates(stack, mongodb_hosts_info):
+    # <private ip>:<port> of the seed candidates, in the given order
+    private_ips = dict((_host_info["hostname"], _host_info["private_ip"]) for _host_info in mongodb_hosts_info)
+    candidates = []
+
+    for hostname in stack.to_list(stack.mongodb_seed_candidates):
+        if hostname not in private_ips:
+            raise Exception(f"seed candidate {hostname} - not one of the mongodb_hosts")
+
+        candidates.append(f"{private_ips[hostname]}:{stack.mongodb_port}")
+
+    return ",".join(candidates)
+
+def _get_network_compressors(stack):
+    # wire compressors in preference order, or "disabled"
+    compressors = [_compressor.strip() for _compressor in stack.mongodb_network_compression.split(",")
+                   if _compressor.strip()]
+
+    if not compressors or compressors[0] in ["none", "disabled"]:
+        return "disabled"
+
+    for _compressor in compressors:
+        if _compressor not in ["snappy", "zstd", "zlib"]:
+            raise Exception(f"network compressor {_compressor} not supported - choose from snappy, zstd, zlib, disabled")
+
+    return ",".join(compressors)
+
+def _get_compressor(stack, key):
+    compressor = stack.get_attr(key) or "none"
+
+    if compressor not in ["snappy", "zstd", "zlib", "none"]:
+        raise Exception(f"{key} {compressor} not supported - choose from snappy, zstd, zlib, none")
+
+    return compressor
+
+def _get_profiling(stack):
+    mode = stack.get_attr("mongodb_profiling_mode") or "off"
+
+    if mode not in ["off", "slowOp", "all"]:
+        raise Exception(f"mongodb_profiling_mode {mode} not supported - choose from off, slowOp, all")
+
+    sample_rate = float(stack.mongodb_slow_op_sample_rate)
+
+    if not 0 < sample_rate <= 1:
+        raise Exception(f"mongodb_slow_op_sample_rate {sample_rate} must be greater than 0 and at most 1")
+
+    return mode, int(stack.mongodb_slow_op_threshold_ms), sample_rate
+
+def _get_ansible_fast_env(num_of_hosts):
+    # opt-in fast provisioning: pipelining, persistent ssh control sockets
+    # through the bastion, forks sized to the replica count, facts cached
+    # across the entry point playbooks and per task timing
+    return {
+        "ANSIBLE_PIPELINING": "True",
+        "ANSIBLE_SSH_ARGS": "-o ControlMaster=auto -o ControlPersist=300s -o ServerAliveInterval=30",
+        "ANSIBLE_SSH_CONTROL_PATH_DIR": "/tmp/.ansible-cp",
+        "ANSIBLE_FORKS": str(max(5, num_of_hosts)),
+        "ANSIBLE_GATHERING": "smart",
+        "ANSIBLE_CACHE_PLUGIN": "jsonfile",
+        "ANSIBLE_CACHE_PLUGIN_CONNECTION": ".ansible_fact_cache",
+        "ANSIBLE_CACHE_PLUGIN_TIMEOUT": "7200",
+        "ANSIBLE_CALLBACKS_ENABLED": "profile_tasks,provision_timing",
+        "ANSIBLE_CALLBACK_WHITELIST": "profile_tasks,provision_timing",
+        "PROFILE_TASKS_TASK_OUTPUT_LIMIT": "all"
+    }
 
 def run(stackargs):
     import json
@@ -109,13 +484,107 @@ def run(stackargs):
     stack.parse.add_optional(key="volume_mountpoint", default="/var/lib/mongodb")
     stack.parse.add_optional(key="volume_fstype", default="xfs")
     stack.parse.add_optional(key="device_name", default="/dev/xvdc")
+
+    # ebs data volume layout - volume_count > 1 stripes the volumes (RAID0)
+    stack.parse.add_optional(key="volume_type", default="gp3")
+    stack.parse.add_optional(key="volume_iops", default="null")
+    stack.parse.add_optional(key="volume_throughput", default="null")
+    stack.parse.add_optional(key="volume_count", default="1")
+    stack.parse.add_optional(key="journal_volume_size", default="null")
     stack.parse.add_optional(key="tf_runtime", default="tofu:1.9.1")
     stack.parse.add_optional(key="ansible_docker_image", default="config0/ansible-run-env")
     stack.parse.add_optional(key="cloud_tags_hash", default='null')
+    stack.parse.add_optional(key="ansible_fast_mode", default='null')
+    stack.parse.add_optional(key="rolling_update", default='null')
+    stack.parse.add_optional(key="ansible_single_pass", default='null')
+
+    # the caller already installed Docker on the bastion - parallel runs
+    # sharing a bastion (mongodb_sharded_on_ec2) would race on apt/dpkg
+    stack.parse.add_optional(key="bastion_prepared", default='null')
+
+    # baked AMIs - mongodb_bake installs only (used by mongodb_ami_bake),
+    # mongodb_preinstalled skips the install phases on a baked AMI
+    stack.parse.add_optional(key="mongodb_bake", default='null')
+    stack.parse.add_optional(key="mongodb_preinstalled", default='null')
+    stack.parse.add_optional(key="mongodb_package_version", default='null')
+
+    # mongod tuning profile - "auto" is derived per host by the mongodb role
+    stack.parse.add_optional(key="instance_type", default="null")
+    stack.parse.add_optional(key="volume_size", default="auto")
+    stack.parse.add_optional(key="mongodb_workload", default="mixed")
+    stack.parse.add_optional(key="mongodb_wt_cache_size_gb", default="auto")
+    stack.parse.add_optional(key="mongodb_oplog_size_mb", default="auto")
+    stack.parse.add_optional(key="mongodb_max_incoming_connections", default="auto")
+    stack.parse.add_optional(key="mongodb_journal_commit_interval_ms", default="auto")
+
+    # wire, collection and journal compression
+    stack.parse.add_optional(key="mongodb_network_compression", default="snappy,zstd,zlib")
+    stack.parse.add_optional(key="mongodb_block_compressor", default="snappy")
+    stack.parse.add_optional(key="mongodb_journal_compressor", default="snappy")
+    stack.parse.add_optional(key="mongodb_index_prefix_compression", default="true")
+
+    # download mongodb-org once and serve it to the replicas from the bastion
+    stack.parse.add_optional(key="mongodb_package_cache", default="true")
+
+    # profiler and slow operation logging - slow ops are logged in every
+    # mode and summarized by mongodb-slowlog on the replicas
+    stack.parse.add_optional(key="mongodb_profiling_mode", default="off")
+    stack.parse.add_optional(key="mongodb_slow_op_threshold_ms", default="100")
+    stack.parse.add_optional(key="mongodb_slow_op_sample_rate", default="1.0")
+
+    # per-member replica set attributes - b64 json of hostname to priority,
+    # votes, hidden, secondaryDelaySecs, tags and arbiterOnly
+    stack.parse.add_optional(key="mongodb_members_hash", default='null')
+
+    # AZ of the application - its members are preferred as primary
+    stack.parse.add_optional(key="app_local_az", default='null')
+
+    # Prometheus exporter on every replica (roles/metrics_exporter)
+    stack.parse.add_optional(key="mongodb_metrics_exporter", default='null')
+    stack.parse.add_optional(key="mongodb_metrics_exporter_address", default="127.0.0.1")
+    stack.parse.add_optional(key="mongodb_metrics_exporter_port", default="9216")
+
+    # snapshot time of the data volumes seeded by seed_mongodb_volumes
+    stack.parse.add_optional(key="mongodb_seed_timestamp", default='null')
+    stack.parse.add_optional(key="mongodb_seed_join_timeout", default="3600")
+
+    # hostnames a snapshot seed may be taken from, in preference order -
+    # only checks the first live member among them instead of the install
+    stack.parse.add_optional(key="mongodb_seed_candidates", default='null')
+
+    # sharded clusters (mongodb_sharded_on_ec2) - config server and shard
+    # replica sets set a replSetName and clusterRole, mongodb_mongos runs
+    # the hosts as routers (no data volume) and registers the shards
+    stack.parse.add_optional(key="mongodb_repl_set_name", default="rs0")
+    stack.parse.add_optional(key="mongodb_cluster_role", default='null')
+    stack.parse.add_optional(key="mongodb_mongos", default='null')
+    stack.parse.add_optional(key="mongodb_config_repl_set_name", default="cfgrs")
+    stack.parse.add_optional(key="mongodb_config_hosts", default='null')
+    stack.parse.add_optional(key="mongodb_shards_hash", default='null')
+    stack.parse.add_optional(key="mongodb_shard_collections_hash", default='null')
+    stack.parse.add_optional(key="mongodb_balancer_window", default='null')
+
+    # backups of a secondary (roles/backup) - mongodb_backup (dump, snapshot)
+    # backs up the member instead of installing, mongodb_backup_schedule
+    # installs a timer on every member that dumps on the selected one
+    stack.parse.add_optional(key="mongodb_backup", default='null')
+    stack.parse.add_optional(key="mongodb_backup_hostname", default='null')
+    stack.parse.add_optional(key="mongodb_backup_dir", default="/var/backups/mongodb")
+    stack.parse.add_optional(key="mongodb_backup_compressor", default="zstd")
+    stack.parse.add_optional(key="mongodb_backup_parallel_collections", default="4")
+    stack.parse.add_optional(key="mongodb_backup_chunk_size_mb", default="1024")
+    stack.parse.add_optional(key="mongodb_backup_keep", default="3")
+    stack.parse.add_optional(key="mongodb_backup_restore_test", default='null')
+    stack.parse.add_optional(key="mongodb_backup_restore_test_dir", default="/var/tmp/mongodb-restore-test")
+    stack.parse.add_optional(key="mongodb_backup_schedule", default='null')
 
     # Add execgroup
     stack.add_substack("config0-publish:::ebs_volume_attach")
 
+    # Add shelloutconfig dependencies
+    stack.add_shelloutconfig('config0-publish:::mongodb::ebs_data_volumes')
+    stack.add_shelloutconfig('config0-publish:::mongodb::ebs_backup_snapshot')
+
     # Add host groups
     stack.add_hostgroups("config0-publish:::ubuntu::docker", "install_docker")
     stack.add_hostgroups("config0-publish:::ansible::ubuntu", "install_python")
@@ -128,18 +597,48 @@ def run(stackargs):
     stack.init_execgroups()
     stack.init_hostgroups()
     stack.init_substacks()
+    stack.init_shelloutconfigs()
+
+    # resource lookups are cached for the duration of this run
+    resource_cache = {}
 
     # get ssh_key
-    private_key = _get_ssh_key(stack)
+    private_key = _get_ssh_key(stack, resource_cache)
 
-    # get mongodb pem key
-    mongodb_pem = _get_mongodb_pem(stack)
+    # an image bake has no replica set - no pem or keyfile
+    if stack.get_attr("mongodb_bake"):
+        mongodb_pem = ""
+        mongodb_keyfile = ""
+    else:
+        # get mongodb pem key
+        mongodb_pem = _get_mongodb_pem(stack, resource_cache)
 
-    # lookup mongodb keyfile needed for secure mongodb replication
-    mongodb_keyfile = _get_mongodb_keyfile(stack)
+        # lookup mongodb keyfile needed for secure mongodb replication
+        mongodb_keyfile = _get_mongodb_keyfile(stack, resource_cache)
 
     # collect mongodb_hosts info
-    mongodb_hosts_info, public_ips, private_ips = _get_mongodb_hosts(stack)
+    members = _get_members(stack)
+    mongodb_hosts_info, public_ips, private_ips = _get_mongodb_hosts(stack, resource_cache, members)
+
+    # single pass - python install, format/mount and the mongodb playbooks
+    # run in one ansible invocation instead of one container per phase
+    single_pass = stack.get_attr("ansible_single_pass") and not stack.get_attr("rolling_update") \
+        and not stack.get_attr("mongodb_bake") and not stack.get_attr("mongodb_mongos") \
+        and not stack.get_attr("mongodb_backup") and not stack.get_attr("mongodb_seed_candidates")
+
+    # mongos routers hold no data - no volumes to attach, format or mount.
+    # Backups and the seed source check run against installed members.
+    no_volumes = stack.get_attr("mongodb_bake") or stack.get_attr("mongodb_mongos") or stack.get_attr("mongodb_backup") \
+        or stack.get_attr("mongodb_seed_candidates")
+
+    volume_layout = None if no_volumes else _get_volume_layout(stack)
+
+    if stack.get_attr("mongodb_seed_timestamp") and volume_layout and volume_layout["own_format"]:
+        raise Exception("snapshot seeded volumes are not supported with striped or split journal layouts")
+
+    # striped/split layouts and seeded volumes are formatted and mounted by
+    # the data_volume role - it never reformats an existing filesystem
+    own_format = bool(volume_layout and volume_layout["own_format"]) or bool(stack.get_attr("mongodb_seed_timestamp"))
 
     # install docker on bastion hosts
     inputargs = {
@@ -149,9 +648,10 @@ def run(stackargs):
         "hostname": stack.bastion_hostname,
         "groups": stack.install_docker
     }
-    stack.add_groups_to_host(**inputargs)
+    if not stack.get_attr("bastion_prepared"):
+        stack.add_groups_to_host(**inputargs)
 
-    # install python on mongodb_hosts
+    # install python on mongodb_hosts - already baked into preinstalled AMIs
     env_vars = {
         "METHOD": "create",
         "STATEFUL_ID": stack.random_id(size=10),
@@ -169,12 +669,14 @@ def run(stackargs):
         "hostname": stack.bastion_hostname,
         "groups": stack.install_python
     }
-    stack.add_groups_to_host(**inputargs)
+    if not stack.get_attr("mongodb_preinstalled") and not single_pass and not stack.get_attr("mongodb_backup") \
+            and not stack.get_attr("mongodb_seed_candidates"):
+        stack.add_groups_to_host(**inputargs)
 
     stack.set_parallel()
 
-    # create and mount volumes
-    for mongodb_host_info in mongodb_hosts_info:
+    # create and mount volumes - the bake image only carries the root disk
+    for mongodb_host_info in ([] if no_volumes else mongodb_hosts_info):
         overide_values = {
             "device_name": stack.device_name,
             "tf_runtime": stack.tf_runtime,
@@ -195,6 +697,37 @@ def run(stackargs):
 
     stack.unset_parallel(wait_all=True)
 
+    # tune the data volume and attach the rest of the layout
+    if volume_layout:
+        stack.set_parallel()
+
+        for mongodb_host_info in mongodb_hosts_info:
+            env_vars = {
+                "METHOD": "create",
+                "INSTANCE_ID": mongodb_host_info["instance_id"],
+                "VOLUME_NAME": mongodb_host_info["volume_name"],
+                "VOLUME_SIZE": volume_layout["volume_size"],
+                "VOLUME_COUNT": volume_layout["volume_count"],
+                "VOLUME_TYPE": stack.volume_type,
+                "DEVICE_NAME": stack.device_name,
+                "AWS_DEFAULT_REGION": stack.aws_default_region
+            }
+
+            for key in ["volume_iops", "volume_throughput", "journal_volume_size", "cloud_tags_hash"]:
+                if stack.get_attr(key):
+                    env_vars[key.upper()] = stack.get_attr(key)
+
+            inputargs = {
+                "display": True,
+                "human_description": f'EBS data volume layout for {mongodb_host_info["hostname"]}',
+                "env_vars": json.dumps(env_vars),
+                "automation_phase": "infrastructure"
+            }
+
+            stack.ebs_data_volumes.resource_exec(**inputargs)
+
+        stack.unset_parallel(wait_all=True)
+
     # Format and mount volumes
     human_description = f'Format and mount volume on mongodb hosts fstype {stack.volume_fstype} mountpoint {stack.volume_mountpoint}'
     env_vars = {
@@ -217,7 +750,9 @@ def run(stackargs):
         "hostname": stack.bastion_hostname,
         "groups": stack.config_vol
     }
-    stack.add_groups_to_host(**inputargs)
+
+    if not no_volumes and not single_pass and not own_format:
+        stack.add_groups_to_host(**inputargs)
 
     # set up ansible for mongodb install
     stateful_id = stack.random_id(size=10)
@@ -241,9 +776,66 @@ def run(stackargs):
         "ANS_VAR_mongodb_main_ips": f"{public_ips[0]},{private_ips[0]}",
         "ANS_VAR_mongodb_public_ips": ",".join(public_ips),
         "ANS_VAR_mongodb_private_ips": ",".join(private_ips),
-        "ANS_VAR_mongodb_config_ips": ",".join(private_ips)
+        "ANS_VAR_mongodb_config_ips": ",".join(private_ips),
+        "ANS_VAR_volume_device": stack.device_name,
+        "ANS_VAR_volume_fstype": stack.volume_fstype,
+        "ANS_VAR_volume_mountpoint": stack.volume_mountpoint,
+        "ANS_VAR_volume_count": volume_layout["volume_count"] if volume_layout else 1,
+        "ANS_VAR_volume_journal_size": stack.journal_volume_size if stack.get_attr("journal_volume_size") else "",
+        "ANS_VAR_mongodb_workload": stack.mongodb_workload,
+        "ANS_VAR_mongodb_volume_size_gb": volume_layout["volume_size"] * volume_layout["volume_count"] if volume_layout else stack.volume_size,
+        "ANS_VAR_mongodb_wt_cache_size_gb": stack.mongodb_wt_cache_size_gb,
+        "ANS_VAR_mongodb_repl_oplog_size": stack.mongodb_oplog_size_mb,
+        "ANS_VAR_mongodb_max_incoming_connections": stack.mongodb_max_incoming_connections,
+        "ANS_VAR_mongodb_journal_commit_interval_ms": stack.mongodb_journal_commit_interval_ms,
+        "ANS_VAR_mongodb_network_compression": _get_network_compressors(stack),
+        "ANS_VAR_mongodb_block_compressor": _get_compressor(stack, "mongodb_block_compressor"),
+        "ANS_VAR_mongodb_journal_compressor": _get_compressor(stack, "mongodb_journal_compressor"),
+        "ANS_VAR_mongodb_index_prefix_compression": str(str(stack.mongodb_index_prefix_compression).lower() in ["true", "1", "yes"]).lower(),
+        "ANS_VAR_mongodb_package_cache": str(str(stack.mongodb_package_cache).lower() in ["true", "1", "yes"]).lower(),
+        "ANS_VAR_mongodb_metrics_exporter": str(str(stack.mongodb_metrics_exporter).lower() in ["true", "1", "yes"]).lower(),
+        "ANS_VAR_mongodb_metrics_exporter_address": stack.mongodb_metrics_exporter_address,
+        "ANS_VAR_mongodb_metrics_exporter_port": stack.mongodb_metrics_exporter_port
     }
 
+    if stack.get_attr("instance_type"):
+        base_env_vars["ANS_VAR_mongodb_instance_type"] = stack.instance_type
+
+    if stack.get_attr("mongodb_package_version"):
+        base_env_vars["ANS_VAR_mongodb_package_version"] = stack.mongodb_package_version
+
+    if stack.get_attr("mongodb_seed_timestamp"):
+        base_env_vars["ANS_VAR_mongodb_seed_timestamp"] = stack.mongodb_seed_timestamp
+        base_env_vars["ANS_VAR_mongodb_seed_join_timeout"] = int(stack.mongodb_seed_join_timeout)
+
+    member_attrs = None if stack.get_attr("mongodb_bake") or stack.get_attr("mongodb_mongos") \
+        else _get_member_attrs(stack, mongodb_hosts_info, members)
+
+    if member_attrs:
+        base_env_vars["ANS_VAR_mongodb_member_attrs_hash"] = stack.b64_encode(member_attrs)
+
+    profiling_mode, slow_op_threshold_ms, slow_op_sample_rate = _get_profiling(stack)
+    base_env_vars["ANS_VAR_mongodb_profiling_mode"] = profiling_mode
+    base_env_vars["ANS_VAR_mongodb_profiling_threshold"] = slow_op_threshold_ms
+    base_env_vars["ANS_VAR_mongodb_profiling_sample_rate"] = slow_op_sample_rate
+
+    for key, value in _get_sharding(stack, resource_cache).items():
+        base_env_vars[f"ANS_VAR_{key}"] = value
+
+    for key, value in _get_backup(stack).items():
+        base_env_vars[f"ANS_VAR_{key}"] = value
+
+    # a snapshot locks the member whose volumes are snapshotted - a dump
+    # picks the member from the live replica set unless one is named
+    backup_host_info = _get_backup_member(stack, mongodb_hosts_info, member_attrs) \
+        if stack.get_attr("mongodb_backup") else None
+
+    if backup_host_info and (stack.mongodb_backup == "snapshot" or stack.get_attr("mongodb_backup_hostname")):
+        base_env_vars["ANS_VAR_mongodb_backup_member"] = f'{backup_host_info["private_ip"]}:{stack.mongodb_port}'
+
+    if stack.get_attr("mongodb_seed_candidates"):
+        base_env_vars["ANS_VAR_mongodb_seed_candidates"] = _get_seed_candidates(stack, mongodb_hosts_info)
+
     # Deploy files Ansible for MongoDb
     human_description = "Setting up Ansible for MongoDb"
     inputargs = {
@@ -258,9 +850,70 @@ def run(stackargs):
     stack.add_groups_to_host(**inputargs)
 
     # mongo install single step
-    human_description = f"Install MongoDb"
+    human_description = "Install MongoDb"
+    timing_run = "install"
     env_vars = base_env_vars.copy()
     env_vars["ANS_VAR_exec_ymls"] = "entry_point/20-mongo-setup.yml,entry_point/30-mongo-init-replica.yml,entry_point/40-mongo-add-slave-replica.yml"
+
+    if own_format:
+        env_vars["ANS_VAR_exec_ymls"] = f'entry_point/20-format.yml,entry_point/30-mount.yml,{env_vars["ANS_VAR_exec_ymls"]}'
+
+    if base_env_vars["ANS_VAR_mongodb_metrics_exporter"] == "true":
+        env_vars["ANS_VAR_exec_ymls"] = f'{env_vars["ANS_VAR_exec_ymls"]},entry_point/45-mongo-metrics-exporter.yml'
+
+    if base_env_vars["ANS_VAR_mongodb_backup_schedule"]:
+        env_vars["ANS_VAR_exec_ymls"] = f'{env_vars["ANS_VAR_exec_ymls"]},entry_point/46-mongo-backup-setup.yml'
+
+    if single_pass:
+        human_description = "Install MongoDb single pass"
+        env_vars["ANS_VAR_exec_ymls"] = "entry_point/05-single-pass.yml"
+
+    # config changes on a live replica set - one secondary at a time, primary last
+    if stack.get_attr("rolling_update"):
+        human_description = f"Rolling update of MongoDb replica set {stack.mongodb_cluster}"
+        timing_run = "rolling-update"
+        env_vars["ANS_VAR_exec_ymls"] = "entry_point/50-mongo-rolling-update.yml"
+
+    # routers of a sharded cluster - the config servers and shards are
+    # installed by their own runs first
+    if stack.get_attr("mongodb_mongos"):
+        human_description = f"Install MongoDb mongos routers for {stack.mongodb_cluster}"
+        timing_run = "mongos"
+        env_vars["ANS_VAR_exec_ymls"] = "entry_point/70-mongos.yml"
+
+    # install-only run for an AMI bake
+    if stack.get_attr("mongodb_bake"):
+        human_description = f"Install MongoDb for image {stack.mongodb_cluster}"
+        timing_run = "bake"
+        env_vars["ANS_VAR_exec_ymls"] = "entry_point/60-mongo-bake.yml"
+
+    # backup of a secondary instead of the install - a snapshot first
+    # fsyncLocks the member
+    if stack.get_attr("mongodb_backup") == "dump":
+        human_description = f"Back up MongoDb {stack.mongodb_cluster} from a secondary"
+        timing_run = "backup"
+        env_vars["ANS_VAR_exec_ymls"] = "entry_point/80-mongo-backup.yml"
+    elif stack.get_attr("mongodb_backup") == "snapshot":
+        human_description = f'Lock MongoDb {backup_host_info["hostname"]} for a snapshot'
+        timing_run = "backup-lock"
+        env_vars["ANS_VAR_exec_ymls"] = "entry_point/81-mongo-backup-lock.yml"
+
+    # checks the member a snapshot seed is taken from - nothing is installed
+    if stack.get_attr("mongodb_seed_candidates"):
+        human_description = f"Check the snapshot seed source of MongoDb {stack.mongodb_cluster}"
+        timing_run = "seed-check"
+        env_vars["ANS_VAR_exec_ymls"] = "entry_point/83-mongo-seed-source.yml"
+
+    # every run of the init_replica execgroup records its own timing report -
+    # config server and shard replica sets share the mongodb_cluster
+    if stack.get_attr("mongodb_cluster_role"):
+        timing_run = f"{stack.mongodb_repl_set_name}-{timing_run}"
+
+    env_vars["ANS_VAR_provision_timing_run"] = timing_run
+
+    if stack.get_attr("ansible_fast_mode"):
+        env_vars.update(_get_ansible_fast_env(len(private_ips)))
+
     env_vars["DOCKER_ENV_FIELDS"] = ",".join(env_vars.keys())
 
     inputargs = {
@@ -274,8 +927,54 @@ def run(stackargs):
     }
     stack.add_groups_to_host(**inputargs)
 
+    # snapshot all data volumes of the locked member at once, then unlock -
+    # if the snapshot fails the member unlocks itself after
+    # backup_auto_unlock_minutes
+    if stack.get_attr("mongodb_backup") == "snapshot":
+        env_vars = {
+            "METHOD": "create",
+            "INSTANCE_ID": backup_host_info["instance_id"],
+            "HOSTNAME": backup_host_info["hostname"],
+            "MONGODB_CLUSTER": stack.mongodb_cluster,
+            "KEEP": stack.mongodb_backup_keep,
+            "AWS_DEFAULT_REGION": stack.aws_default_region
+        }
+
+        if stack.get_attr("cloud_tags_hash"):
+            env_vars["CLOUD_TAGS_HASH"] = stack.cloud_tags_hash
+
+        inputargs = {
+            "display": True,
+            "human_description": f'EBS snapshot backup of {backup_host_info["hostname"]}',
+            "env_vars": json.dumps(env_vars),
+            "automation_phase": "infrastructure"
+        }
+
+        stack.ebs_backup_snapshot.resource_exec(**inputargs)
+
+        env_vars = base_env_vars.copy()
+        env_vars["ANS_VAR_exec_ymls"] = "entry_point/82-mongo-backup-unlock.yml"
+        env_vars["ANS_VAR_provision_timing_run"] = "backup-unlock"
+
+        if stack.get_attr("ansible_fast_mode"):
+            env_vars.update(_get_ansible_fast_env(len(private_ips)))
+
+        env_vars["DOCKER_ENV_FIELDS"] = ",".join(env_vars.keys())
+
+        inputargs = {
+            "display": True,
+            "human_description": f'Unlock MongoDb {backup_host_info["hostname"]} after the snapshot',
+            "env_vars": json.dumps(env_vars),
+            "stateful_id": stateful_id,
+            "automation_phase": "infrastructure",
+            "hostname": stack.bastion_hostname,
+            "groups": stack.ubuntu_vendor_init_replica
+        }
+        stack.add_groups_to_host(**inputargs)
+
     # publish variables
-    if stack.get_attr("publish_to_saas"):
+    if stack.get_attr("publish_to_saas") and not stack.get_attr("mongodb_bake") and not stack.get_attr("mongodb_backup") \
+            and not stack.get_attr("mongodb_seed_candidates"):
         _publish_vars = {
             "mongodb_cluster": stack.mongodb_cluster,
             "mongodb_port": stack.mongodb_port,
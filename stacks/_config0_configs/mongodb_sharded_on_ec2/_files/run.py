@@ -0,0 +1,709 @@
+"""
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+class Main(newSchedStack):
+
+    def __init__(self, stackargs):
+
+        newSchedStack.__init__(self, stackargs)
+
+        # Add default variables
+        self.parse.add_required(key="mongodb_cluster",
+                                types="str",
+                                tags="create_vm,mongo_replica")
+
+        # the admin user is shared by the config servers, shards and routers
+        self.parse.add_required(key="mongodb_username",
+                                types="str",
+                                tags="mongo_replica")
+
+        self.parse.add_required(key="mongodb_password",
+                                types="str",
+                                tags="mongo_replica")
+
+        self.parse.add_optional(key="num_of_shards",
+                                types="int",
+                                default="2")
+
+        # replicas per shard
+        self.parse.add_optional(key="num_of_replicas",
+                                types="int",
+                                default="3")
+
+        self.parse.add_optional(key="num_of_config_servers",
+                                types="int",
+                                default="3")
+
+        self.parse.add_optional(key="num_of_mongos",
+                                types="int",
+                                default="2")
+
+        # b64 json of "db.collection" to {"key": {...}, "unique": bool}
+        self.parse.add_optional(key="mongodb_shard_collections_hash",
+                                types="str",
+                                default="null")
+
+        # HH:MM-HH:MM - chunk migrations only run inside the window
+        self.parse.add_optional(key="mongodb_balancer_window",
+                                types="str",
+                                default="null")
+
+        self.parse.add_optional(key="ami",
+                                types="str",
+                                default="null")
+
+        self.parse.add_optional(key="ami_filter",
+                                types="str",
+                                default='ubuntu/images/hvm-ssd-gp3/ubuntu-noble-24.04-amd64-server-*')
+
+        self.parse.add_optional(key="ami_owner",
+                                default='099720109477')
+
+        self.parse.add_optional(key="aws_default_region",
+                                types="str",
+                                tags="create_vm,bastion,mongo_replica",
+                                default="us-east-1")
+
+        self.parse.add_optional(key="pem_key_algorithm",
+                                choices=["rsa2048", "rsa3072", "rsa4096", "ecdsa-p256", "ecdsa-p384"],
+                                types="str",
+                                default="rsa2048")
+
+        # wire and collection compression
+        self.parse.add_optional(key="mongodb_network_compression",
+                                types="str",
+                                tags="mongo_replica",
+                                default="snappy,zstd,zlib")
+
+        self.parse.add_optional(key="mongodb_block_compressor",
+                                choices=["snappy", "zstd", "zlib", "none"],
+                                types="str",
+                                tags="mongo_replica",
+                                default="snappy")
+
+        self.parse.add_optional(key="mongodb_workload",
+                                choices=["read_heavy", "write_heavy", "mixed"],
+                                types="str",
+                                tags="mongo_replica",
+                                default="mixed")
+
+        # AZ of the application - replicas of every set are spread round-robin
+        # over subnet_ids and the members in this AZ are preferred as primary
+        self.parse.add_optional(key="app_local_az",
+                                types="str",
+                                tags="mongo_replica",
+                                default="null")
+
+        # Prometheus exporter on every config server and shard replica
+        self.parse.add_optional(key="mongodb_metrics_exporter",
+                                types="bool",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="mongodb_metrics_exporter_address",
+                                types="str",
+                                tags="mongo_replica",
+                                default="127.0.0.1")
+
+        self.parse.add_optional(key="mongodb_metrics_exporter_port",
+                                types="int",
+                                tags="mongo_replica",
+                                default="9216")
+
+        self.parse.add_optional(key="ansible_fast_mode",
+                                types="bool",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_required(key="bastion_sg_id",
+                                default="null")
+
+        self.parse.add_required(key="bastion_subnet_ids",
+                                default="null")
+
+        self.parse.add_optional(key="bastion_ami",
+                                default="null")
+
+        self.parse.add_optional(key="bastion_ami_filter",
+                                types = "str",
+                                default="ubuntu/images/hvm-ssd/ubuntu-jammy-22.04-amd64-server-*")
+
+        self.parse.add_optional(key="bastion_ami_owner",
+                                default='099720109477')
+
+        self.parse.add_optional(key="bastion_destroy",
+                                default="null")
+
+        self.parse.add_required(key="sg_id",
+                                tags="create_vm",
+                                default="null")
+
+        self.parse.add_required(key="vpc_id",
+                                tags="create_vm,bastion",
+                                default="null")
+
+        self.parse.add_required(key="subnet_ids",
+                                tags="create_vm",
+                                default="null")
+
+        # shard replicas - config servers and routers default to it
+        self.parse.add_optional(key="instance_type",
+                                types="str",
+                                tags="create_vm,bastion,mongo_replica",
+                                default="t3.micro")
+
+        self.parse.add_optional(key="config_instance_type",
+                                types="str",
+                                default="null")
+
+        self.parse.add_optional(key="mongos_instance_type",
+                                types="str",
+                                default="null")
+
+        self.parse.add_optional(key="disksize",
+                                types="int",
+                                tags="create_vm,bastion",
+                                default="20")
+
+        self.parse.add_optional(key="cloud_tags_hash",
+                                types="str",
+                                tags="create_vm,bastion",
+                                default='null')
+
+        self.parse.add_optional(key="publish_to_saas",
+                                types="bool",
+                                default='null')
+
+        # data disk of the shard replicas
+        self.parse.add_optional(key="volume_size",
+                                types="int",
+                                tags="create_vm,mongo_replica",
+                                default=100)
+
+        # config servers only hold the cluster metadata
+        self.parse.add_optional(key="config_volume_size",
+                                types="int",
+                                default=20)
+
+        self.parse.add_optional(key="volume_mountpoint",
+                                types="str",
+                                tags="create_vm,mongo_replica",
+                                default="/var/lib/mongodb")
+
+        self.parse.add_optional(key="volume_fstype",
+                                types="str",
+                                tags="create_vm,mongo_replica",
+                                default="xfs")
+
+        self.parse.add_optional(key="volume_type",
+                                types="str",
+                                tags="mongo_replica",
+                                default="gp3")
+
+        self.parse.add_optional(key="volume_iops",
+                                types="int",
+                                tags="mongo_replica",
+                                default="null")
+
+        self.parse.add_optional(key="volume_throughput",
+                                types="int",
+                                tags="mongo_replica",
+                                default="null")
+
+        # Add substack
+        self.stack.add_substack('config0-publish:::ec2_ubuntu')
+        self.stack.add_substack('config0-publish:::create_mongodb_pem')
+        self.stack.add_substack('config0-publish:::create_mongodb_keyfile')
+        self.stack.add_substack('config0-publish:::mongodb_replica_ubuntu')
+        self.stack.add_substack('config0-publish:::delete_resource')
+        self.stack.add_substack('config0-publish:::new_ec2_ssh_key')
+        self.stack.add_substack('config0-publish:::config0_core::output_resource_to_ui')
+
+        self.stack.init_substacks()
+
+        # installed once before the replica set installs fan out on the
+        # shared bastion
+        self.stack.add_hostgroups("config0-publish:::ubuntu::docker", "install_docker")
+        self.stack.init_hostgroups()
+
+    def _set_bastion_hostname(self):
+        self.stack.set_variable("bastion_hostname",
+                                f"{self.stack.hostname_base}-config",
+                                tags="mongo_replica")
+
+    def _set_hostname_base(self):
+        self.stack.set_variable("hostname_base",
+                                f"{self.stack.mongodb_cluster}-sharded")
+
+    def _set_ssh_key_name(self):
+        self.stack.set_variable("ssh_key_name",
+                                f"{self.stack.mongodb_cluster}-ssh-key",
+                                tags="bastion,create_vm,mongo_replica",
+                                types="str")
+
+    def _get_hosts(self, role, count):
+        return [f"{self.stack.hostname_base}-{role}-num-{num}".replace("_", "-")
+                for num in range(int(count))]
+
+    def _get_config_hosts(self):
+        return self._get_hosts("cfg", self.stack.num_of_config_servers)
+
+    def _get_shard_hosts(self):
+        # shard replSetName to its hosts
+        return dict((f"shard{shard}", self._get_hosts(f"shard{shard}", self.stack.num_of_replicas))
+                    for shard in range(int(self.stack.num_of_shards)))
+
+    def _get_mongos_hosts(self):
+        return self._get_hosts("mongos", self.stack.num_of_mongos)
+
+    def _get_subnet_ids(self):
+        if isinstance(self.stack.subnet_ids, list):
+            return self.stack.subnet_ids
+
+        return [subnet_id.strip() for subnet_id in str(self.stack.subnet_ids).split(",") if subnet_id.strip()]
+
+    def _get_subnet_id(self, hostname, subnet_ids):
+        # host N of a replica set (or the routers) always lands in subnet
+        # N % len(subnet_ids) - resizing a set never moves a host to another AZ
+        return subnet_ids[int(hostname.rsplit("-num-", 1)[1]) % len(subnet_ids)]
+
+    def _get_create_arguments(self):
+        arguments = self.stack.get_tagged_vars(tag="create_vm", output="dict")
+
+        arguments["size"] = self.stack.instance_type
+        arguments["bootstrap_for_exec"] = None
+        arguments["ip_key"] = "private_ip"
+
+        if self.stack.get_attr("ami"):
+            arguments["ami"] = self.stack.ami
+        elif self.stack.get_attr("ami_filter") and self.stack.get_attr("ami_owner"):
+            arguments["ami_filter"] = self.stack.ami_filter
+            arguments["ami_owner"] = self.stack.ami_owner
+
+        return arguments
+
+    def run_sshkey(self):
+        self.stack.init_variables()
+        self._set_ssh_key_name()
+
+        arguments = {
+            "key_name": self.stack.ssh_key_name,
+            "clobber": True,
+            "aws_default_region": self.stack.aws_default_region
+        }
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f'Create and upload ssh key name {self.stack.ssh_key_name}'
+        }
+
+        return self.stack.new_ec2_ssh_key.insert(display=True, **inputargs)
+
+    def run_pem(self):
+        self.stack.init_variables()
+
+        inputargs = {
+            "arguments": {
+                "basename": self.stack.mongodb_cluster,
+                "key_algorithm": self.stack.pem_key_algorithm
+            }
+        }
+
+        return self.stack.create_mongodb_pem.insert(display=True, **inputargs)
+
+    def run_keyfile(self):
+        self.stack.init_variables()
+
+        inputargs = {
+            "arguments": {
+                "basename": self.stack.mongodb_cluster
+            }
+        }
+
+        return self.stack.create_mongodb_keyfile.insert(display=True, **inputargs)
+
+    def run_bastion(self):
+        self.stack.init_variables()
+
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+        self._set_ssh_key_name()
+
+        arguments = self.stack.get_tagged_vars(tag="bastion", output="dict")
+
+        arguments["size"] = self.stack.instance_type
+        arguments["hostname"] = self.stack.bastion_hostname
+        arguments["subnet_ids"] = self.stack.bastion_subnet_ids
+        arguments["sg_id"] = self.stack.bastion_sg_id
+        arguments["bootstrap_for_exec"] = True
+        arguments["ip_key"] = "public_ip"
+
+        if self.stack.get_attr("bastion_ami"):
+            arguments["ami"] = self.stack.bastion_ami
+        elif self.stack.get_attr("bastion_ami_filter") and self.stack.get_attr("bastion_ami_owner"):
+            arguments["ami_filter"] = self.stack.bastion_ami_filter
+            arguments["ami_owner"] = self.stack.bastion_ami_owner
+
+        human_description = f"Creating bastion config hostname {self.stack.bastion_hostname} on ec2"
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": human_description
+        }
+
+        return self.stack.ec2_ubuntu.insert(display=True, **inputargs)
+
+    def run_bastion_setup(self):
+        self.stack.init_variables()
+
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+
+        inputargs = {
+            "display": True,
+            "human_description": f"Install Docker on bastion {self.stack.bastion_hostname}",
+            "automation_phase": "infrastructure",
+            "hostname": self.stack.bastion_hostname,
+            "groups": self.stack.install_docker
+        }
+
+        self.stack.add_groups_to_host(**inputargs)
+
+        return self.stack.get_results()
+
+    def run_create(self):
+        self.stack.init_variables()
+
+        self._set_hostname_base()
+        self._set_ssh_key_name()
+
+        subnet_ids = self._get_subnet_ids()
+
+        # (hosts, size, volume_size) of every replica set and the routers
+        host_sets = [(self._get_config_hosts(),
+                      self.stack.get_attr("config_instance_type") or self.stack.instance_type,
+                      self.stack.config_volume_size)]
+
+        for _hosts in self._get_shard_hosts().values():
+            host_sets.append((_hosts, self.stack.instance_type, self.stack.volume_size))
+
+        host_sets.append((self._get_mongos_hosts(),
+                          self.stack.get_attr("mongos_instance_type") or self.stack.instance_type,
+                          None))
+
+        # create vms in parallel
+        self.stack.set_parallel()
+
+        for _hosts, size, volume_size in host_sets:
+            # each replica set spans the subnets (AZs) on its own
+            for hostname in _hosts:
+                arguments = self._get_create_arguments()
+                arguments["hostname"] = hostname
+                arguments["size"] = size
+                arguments["subnet_ids"] = self._get_subnet_id(hostname, subnet_ids)
+
+                # routers hold no data
+                if volume_size:
+                    arguments["volume_size"] = volume_size
+                    arguments["volume_name"] = f"{hostname}-{self.stack.volume_mountpoint}".replace("/", "-").replace(".", "-")  # ref 45304958324
+                else:
+                    arguments.pop("volume_size", None)
+
+                inputargs = {
+                    "arguments": arguments,
+                    "automation_phase": "infrastructure",
+                    "human_description": f"Creating hostname {hostname} on ec2"
+                }
+
+                self.stack.ec2_ubuntu.insert(display=True, **inputargs)
+
+        self.stack.unset_parallel(wait_all=True)
+
+        return self.stack.get_results()
+
+    def _get_install_arguments(self):
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+        self._set_ssh_key_name()
+
+        arguments = self.stack.get_tagged_vars(tag="mongo_replica", output="dict")
+
+        # Docker is installed by bastion_setup - the parallel runs do not
+        # each run apt on the shared bastion
+        arguments["bastion_prepared"] = True
+
+        return arguments
+
+    def run_install_config(self):
+        self.stack.init_variables()
+
+        arguments = self._get_install_arguments()
+        arguments["mongodb_hosts"] = self._get_config_hosts()
+        arguments["mongodb_repl_set_name"] = "cfgrs"
+        arguments["mongodb_cluster_role"] = "configsvr"
+        arguments["volume_size"] = self.stack.config_volume_size
+
+        if self.stack.get_attr("config_instance_type"):
+            arguments["instance_type"] = self.stack.config_instance_type
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Install the config server replica set of {self.stack.mongodb_cluster}"
+        }
+
+        return self.stack.mongodb_replica_ubuntu.insert(display=True, **inputargs)
+
+    def run_install_shards(self):
+        self.stack.init_variables()
+
+        self.stack.set_parallel()
+
+        for shard_name, _hosts in self._get_shard_hosts().items():
+            arguments = self._get_install_arguments()
+            arguments["mongodb_hosts"] = _hosts
+            arguments["mongodb_repl_set_name"] = shard_name
+            arguments["mongodb_cluster_role"] = "shardsvr"
+
+            inputargs = {
+                "arguments": arguments,
+                "automation_phase": "infrastructure",
+                "human_description": f"Install shard replica set {shard_name} of {self.stack.mongodb_cluster}"
+            }
+
+            self.stack.mongodb_replica_ubuntu.insert(display=True, **inputargs)
+
+        self.stack.unset_parallel(wait_all=True)
+
+        return self.stack.get_results()
+
+    def run_install_mongos(self):
+        self.stack.init_variables()
+
+        arguments = self._get_install_arguments()
+        arguments["mongodb_hosts"] = self._get_mongos_hosts()
+        arguments["mongodb_mongos"] = True
+        arguments["mongodb_config_repl_set_name"] = "cfgrs"
+        arguments["mongodb_config_hosts"] = self._get_config_hosts()
+        arguments["mongodb_shards_hash"] = self.stack.b64_encode(self._get_shard_hosts())
+
+        if self.stack.get_attr("mongos_instance_type"):
+            arguments["instance_type"] = self.stack.mongos_instance_type
+
+        for key in ["mongodb_shard_collections_hash", "mongodb_balancer_window"]:
+            if self.stack.get_attr(key):
+                arguments[key] = self.stack.get_attr(key)
+
+        # applications connect to the routers
+        if self.stack.get_attr("publish_to_saas"):
+            arguments["publish_to_saas"] = True
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": f"Install the mongos routers of {self.stack.mongodb_cluster}"
+        }
+
+        return self.stack.mongodb_replica_ubuntu.insert(display=True, **inputargs)
+
+    def run_cleanup(self):
+        self.stack.init_variables()
+
+        self._set_hostname_base()
+        self._set_bastion_hostname()
+
+        arguments = {"resource_type": "server"}
+
+        if self.stack.get_attr("bastion_destroy"):
+            arguments["must_exists"] = True
+            arguments["hostname"] = self.stack.bastion_hostname
+
+            human_description = f"Destroying bastion config hostname {self.stack.bastion_hostname} on ec2"
+
+            inputargs = {
+                "arguments": arguments,
+                "automation_phase": "infrastructure",
+                "human_description": human_description
+            }
+
+            return self.stack.delete_resource.insert(display=True, **inputargs)
+
+        # publish the info
+        keys_to_publish = [
+            "region",
+            "name",
+            "private_ip",
+            "public_ip",
+            "instance_id",
+            "ami",
+            "availability_zone",
+            "aws_default_region"
+        ]
+
+        human_description = f'Publish resource info for {self.stack.bastion_hostname}'
+
+        arguments["prefix_key"] = "bastion"
+        arguments["name"] = self.stack.bastion_hostname
+        arguments["publish_keys_hash"] = self.stack.b64_encode(keys_to_publish)
+
+        inputargs = {
+            "arguments": arguments,
+            "automation_phase": "infrastructure",
+            "human_description": human_description
+        }
+
+        return self.stack.output_resource_to_ui.insert(display=True, **inputargs)
+
+    def run(self):
+        self.stack.unset_parallel(sched_init=True)
+        self.add_job("sshkey")
+        self.add_job("pem")
+        self.add_job("keyfile")
+        self.add_job("bastion")
+        self.add_job("bastion_setup")
+        self.add_job("create")
+        self.add_job("install_config")
+        self.add_job("install_shards")
+        self.add_job("install_mongos")
+        self.add_job("cleanup")
+
+        return self.finalize_jobs()
+
+    def schedule(self):
+        # sshkey, pem and keyfile are root jobs; the bastion and the vms need
+        # the ssh key and fan out from it. Docker goes on the bastion once
+        # (bastion_setup) before the config servers and the shards - independent
+        # replica sets - install in parallel, the routers need both of them.
+        sched = self.new_schedule()
+        sched.job = "sshkey"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.conditions.retries = 1
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create and upload ssh-key"
+        sched.on_success = ["bastion", "create"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "pem"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create and upload MongoDB PEM"
+        sched.on_success = ["install_config", "install_shards"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "keyfile"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create and upload MongoDB keyfile"
+        sched.on_success = ["install_config", "install_shards"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "bastion"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create MongoDB Bastion Config"
+        sched.conditions.dependency = ["sshkey"]
+        sched.on_success = ["bastion_setup"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "bastion_setup"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Install Docker on MongoDB Bastion Config"
+        sched.conditions.dependency = ["bastion"]
+        sched.on_success = ["install_config", "install_shards"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "create"
+        sched.archive.timeout = 3600
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Create MongoDB Config Server, Shard and Router VMs"
+        sched.conditions.dependency = ["sshkey"]
+        sched.on_success = ["install_config", "install_shards"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "install_config"
+        sched.archive.timeout = 3600
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Install MongoDB Config Server Replica Set"
+        sched.conditions.dependency = ["sshkey", "pem", "keyfile", "bastion_setup", "create"]
+        sched.on_success = ["install_mongos"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "install_shards"
+        sched.archive.timeout = 3600
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Install MongoDB Shard Replica Sets"
+        sched.conditions.dependency = ["sshkey", "pem", "keyfile", "bastion_setup", "create"]
+        sched.on_success = ["install_mongos"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "install_mongos"
+        sched.archive.timeout = 3600
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Install MongoDB Routers and Add Shards"
+        sched.conditions.dependency = ["install_config", "install_shards"]
+        sched.on_success = ["cleanup"]
+        self.add_schedule()
+
+        sched = self.new_schedule()
+        sched.job = "cleanup"
+        sched.archive.timeout = 1800
+        sched.archive.timewait = 120
+        sched.archive.cleanup.instance = "clear"
+        sched.failure.keep_resources = True
+        sched.automation_phase = "infrastructure"
+        sched.human_description = "Destroy MongoDB Bastion Config"
+        self.add_schedule()
+
+        return self.get_schedules()
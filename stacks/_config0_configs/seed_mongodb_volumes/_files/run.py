@@ -0,0 +1,91 @@
+"""
+# Copyright (C) 2025 Gary Leong <gary@config0.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+def run(stackargs):
+    """Seed the data volumes of new MongoDB replicas from a member snapshot."""
+    import json
+
+    # Instantiate authoring stack
+    stack = newStack(stackargs)
+
+    # Add default variables
+    stack.parse.add_required(key="mongodb_cluster")
+    stack.parse.add_required(key="mongodb_hosts")
+
+    stack.parse.add_optional(key="seed_hostname", default="null")
+    stack.parse.add_optional(key="seed_candidates", default="null")
+    stack.parse.add_optional(key="volume_mountpoint", default="/var/lib/mongodb")
+    stack.parse.add_optional(key="volume_type", default="gp3")
+    stack.parse.add_optional(key="volume_size", default="null")
+    stack.parse.add_optional(key="volume_iops", default="null")
+    stack.parse.add_optional(key="volume_throughput", default="null")
+    stack.parse.add_optional(key="aws_default_region", default="us-east-1")
+    stack.parse.add_optional(key="cloud_tags_hash", default="null")
+
+    # Add shelloutconfig dependencies
+    stack.add_shelloutconfig('config0-publish:::mongodb::ebs_snapshot_seed')
+
+    # Initialize
+    stack.init_variables()
+    stack.init_shelloutconfigs()
+
+    targets = []
+
+    for hostname in stack.to_list(stack.mongodb_hosts):
+        _lookup = {
+            "must_exists": True,
+            "must_be_one": True,
+            "resource_type": "server",
+            "hostname": hostname
+        }
+        server = list(stack.get_resource(**_lookup))[0]
+
+        targets.append({
+            "hostname": hostname,
+            "instance_id": server["instance_id"],
+            # ref 45304958324
+            "volume_name": f"{hostname}-{stack.volume_mountpoint}".replace("/", "-").replace(".", "-")
+        })
+
+    env_vars = {
+        "METHOD": "create",
+        "MONGODB_CLUSTER": stack.mongodb_cluster,
+        "VOLUME_TARGETS_HASH": stack.b64_encode(targets),
+        "VOLUME_TYPE": stack.volume_type,
+        "AWS_DEFAULT_REGION": stack.aws_default_region
+    }
+
+    if not stack.get_attr("seed_hostname") and not stack.get_attr("seed_candidates"):
+        raise Exception("seed_hostname or seed_candidates is required")
+
+    if stack.get_attr("seed_candidates"):
+        env_vars["SEED_CANDIDATES"] = ",".join(stack.to_list(stack.seed_candidates))
+
+    for key in ["seed_hostname", "volume_size", "volume_iops", "volume_throughput", "cloud_tags_hash"]:
+        if stack.get_attr(key):
+            env_vars[key.upper()] = stack.get_attr(key)
+
+    inputargs = {
+        "display": True,
+        "human_description": f'Seed MongoDB data volumes for {stack.mongodb_cluster} from a snapshot',
+        "env_vars": json.dumps(env_vars),
+        "automation_phase": "infrastructure"
+    }
+
+    stack.ebs_snapshot_seed.resource_exec(**inputargs)
+
+    return stack.get_results()